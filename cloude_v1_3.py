@@ -69,31 +69,32 @@ import gtts
 import io
 import pygame
 import numpy as np
-from pydub import AudioSegment
-import tempfile
 import os
 
+from tts_cache import get_audio_cache
+from tts_engines import get_engines
+from lip_sync import AmplitudeEnvelope
+from visemes import VisemeTimeline, mouth_outline
+
 class GTTSAnimatedSpeaker:
     def __init__(self):
-        pygame.mixer.init()
+        # The shared mixer, at the TTS engines' native rate
+        get_engines().get("mixer")
         
     def speak_with_gtts(self, text, lang='en'):
-        # Generate speech
-        tts = gtts.gTTS(text=text, lang=lang)
+        # Generate speech into memory; no temp file is held open while pygame loads it
+        def synthesize():
+            buffer = io.BytesIO()
+            gtts.gTTS(text=text, lang=lang).write_to_fp(buffer)
+            return buffer.getvalue()
+        audio = get_audio_cache().audio("gtts", text, synthesize, lang=lang)
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            tts.save(tmp_file.name)
-            
-            # Play audio with visualization
-            self._play_with_animation(tmp_file.name)
-            
-            # Clean up
-            os.unlink(tmp_file.name)
+        # Play audio with visualization
+        self._play_with_animation(io.BytesIO(audio))
     
-    def _play_with_animation(self, audio_file):
+    def _play_with_animation(self, audio):
         # Load and play audio
-        pygame.mixer.music.load(audio_file)
+        pygame.mixer.music.load(audio, "mp3")
         pygame.mixer.music.play()
         
         # Simple visualization while playing
@@ -152,34 +153,33 @@ class GTTSAnimatedSpeaker:
 class CoquiTTSAnimatedSpeaker:
     def __init__(self):
         try:
-            from TTS.api import TTS
-            # Initialize TTS with a multilingual model
-            self.tts = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
-            print("Coqui TTS initialized successfully!")
+            # The multilingual model is loaded once per process and shared by every speaker
+            self.tts = get_engines().get("coqui")
         except ImportError:
             print("Coqui TTS not installed. Install with: pip install TTS")
             self.tts = None
     
-    def speak_advanced(self, text, output_path="output.wav"):
+    def speak_advanced(self, text, output_path=None):
         if not self.tts:
             print("TTS not available")
             return
             
-        # Generate speech
-        self.tts.tts_to_file(text=text, file_path=output_path)
+        # Generate speech, reusing earlier audio for the same text unless a file was asked for
+        if output_path:
+            self.tts.tts_to_file(text=text, file_path=output_path)
+        else:
+            output_path = get_audio_cache().cached(
+                "coqui-xtts_v2", text, lambda path: self.tts.tts_to_file(text=text, file_path=path), ext="wav")
         
         # Play with advanced animation
-        self._advanced_animation(output_path)
+        self._advanced_animation(output_path, text)
     
-    def _advanced_animation(self, audio_file):
+    def _advanced_animation(self, audio_file, text):
         # Load audio for analysis
         try:
-            audio = AudioSegment.from_wav(audio_file)
-            samples = np.array(audio.get_array_of_samples())
-            
-            if audio.channels == 2:
-                samples = samples.reshape((-1, 2))
-                samples = samples.mean(axis=1)
+            envelope = AmplitudeEnvelope.from_audio(audio_file)
+            # Coqui reports no word timings, so the words are spread over the voiced parts of the audio
+            visemes = VisemeTimeline.estimate(text, envelope)
             
             # Create animation based on audio amplitude
             fig, ax = plt.subplots(figsize=(8, 8))
@@ -206,22 +206,18 @@ class CoquiTTSAnimatedSpeaker:
             mouth_line, = ax.plot([], [], 'r-', linewidth=5)
             
             # Play audio
-            pygame.mixer.init()
+            get_engines().get("mixer")
             pygame.mixer.music.load(audio_file)
             pygame.mixer.music.play()
             
             def animate(frame):
                 if pygame.mixer.music.get_busy():
-                    # Get audio amplitude for this frame
-                    sample_idx = min(frame * 100, len(samples) - 1)
-                    amplitude = abs(samples[sample_idx]) / 32768.0 if len(samples) > sample_idx else 0
-                    
-                    # Animate mouth based on amplitude
-                    mouth_width = 0.5 + amplitude * 0.8
-                    mouth_height = amplitude * 0.3
+                    # Viseme and audio amplitude at the current playback position
+                    position = pygame.mixer.music.get_pos()
+                    amplitude = envelope.at(position)
                     
-                    x = np.linspace(-mouth_width, mouth_width, 20)
-                    y = mouth_height * np.sin(np.pi * x / mouth_width) - 0.8
+                    # Animate mouth based on both
+                    x, y = mouth_outline(visemes.viseme_at(position), amplitude, 0.9, 0.5, -0.8, 20)
                     mouth_line.set_data(x, y)
                     
                     # Animate eyebrows based on speech
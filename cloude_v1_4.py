@@ -1,18 +1,29 @@
-import pyttsx3
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import numpy as np
 from threading import Thread
-import time
-import tempfile
+import io
 import os
+import tempfile
+import time
 import pygame
 
+from lip_sync import AmplitudeEnvelope
+from tts_cache import get_audio_cache
+from tts_engines import get_engines
+from tts_stream import StreamingPlayer, edge_sentence, edge_speech, gtts_audio, synthesize_chunks
+from visemes import VisemeTimeline, mouth_outline, ms_per_letter
+import video_export
+
 # Method 1: Simple TTS with Basic Animation (WORKING)
 class SimpleAnimatedSpeaker:
+    figsize = (8, 8)
+    
     def __init__(self):
-        self.engine = pyttsx3.init()
+        self.engine = get_engines().get("pyttsx3")
         self.is_speaking = False
+        self.visemes = VisemeTimeline()
+        self.speech_started = 0.0
         
     def speak_with_animation(self, text):
         print(f"Speaking: {text}")
@@ -25,13 +36,39 @@ class SimpleAnimatedSpeaker:
         self._animate_mouth()
         
     def _speak(self, text):
+        # pyttsx3 only reports when each word starts, so its length is estimated from the speaking rate
+        letter_ms = ms_per_letter * 200 / (self.engine.getProperty('rate') or 200)
+        
+        def on_word(name, location, length):
+            position_ms = (time.monotonic() - self.speech_started) * 1000
+            self.visemes.add_word(position_ms, length * letter_ms, text[location:location + length])
+        
+        self.visemes = VisemeTimeline()
+        self.speech_started = time.monotonic()
+        token = self.engine.connect('started-word', on_word)
         self.is_speaking = True
-        self.engine.say(text)
-        self.engine.runAndWait()
-        self.is_speaking = False
+        try:
+            self.engine.say(text)
+            self.engine.runAndWait()
+        finally:
+            self.engine.disconnect(token)
+            self.is_speaking = False
         
     def _animate_mouth(self):
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig, ax = plt.subplots(figsize=self.figsize)
+        # Mouth shape of the word being spoken right now
+        update = self.build_scene(ax, lambda t_ms: (self.visemes.viseme_at(t_ms), 1.0) if self.is_speaking else None)
+        
+        def animate(frame):
+            return update((time.monotonic() - self.speech_started) * 1000)
+        
+        ani = animation.FuncAnimation(fig, animate, frames=200, 
+                                    interval=100, blit=True, repeat=True)
+        plt.tight_layout()
+        plt.show()
+    
+    def build_scene(self, ax, lipsync):
+        """Draw the face on ax; returns update(t_ms), which poses it from lipsync(t_ms) and returns the changed artists"""
         ax.set_xlim(-2, 2)
         ax.set_ylim(-2, 2)
         ax.set_aspect('equal')
@@ -59,13 +96,10 @@ class SimpleAnimatedSpeaker:
         # Title
         ax.text(0, 1.8, 'AI Assistant Speaking', ha='center', fontsize=14, color='white', weight='bold')
         
-        def animate(frame):
-            if self.is_speaking:
-                # Create mouth movement
-                mouth_width = 0.3 + 0.3 * np.sin(frame * 0.5)
-                mouth_height = 0.15 * np.sin(frame * 0.3)
-                x = np.linspace(-mouth_width, mouth_width, 15)
-                y = mouth_height * np.sin(np.pi * x / mouth_width) - 0.5
+        def update(t_ms):
+            speech = lipsync(t_ms)
+            if speech:
+                x, y = mouth_outline(*speech, 0.6, 0.3, -0.5, 15)
                 mouth_line.set_data(x, y)
             else:
                 # Closed mouth
@@ -74,69 +108,83 @@ class SimpleAnimatedSpeaker:
                 mouth_line.set_data(x, y)
             return mouth_line,
         
-        ani = animation.FuncAnimation(fig, animate, frames=200, 
-                                    interval=100, blit=True, repeat=True)
-        plt.tight_layout()
-        plt.show()
+        return update
+    
+    def export_video(self, text, output, fps=video_export.fps):
+        """Render the utterance to an MP4 without a display; returns the frame count"""
+        fd, wav_path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, wav_path)
+            self.engine.runAndWait()
+            with open(wav_path, "rb") as f:
+                audio = f.read()
+        finally:
+            os.unlink(wav_path)
+        envelope = AmplitudeEnvelope.from_audio(audio)
+        lipsync = video_export.envelope_lipsync(envelope, VisemeTimeline.estimate(text, envelope))
+        return video_export.render_video(self.figsize, self.build_scene, lipsync, audio,
+                                         envelope.duration_ms, output, fps)
 
 # Method 2: Fixed Google TTS with Animation
 class FixedGTTSAnimatedSpeaker:
+    figsize = (10, 8)
+    
     def __init__(self):
-        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        get_engines().get("mixer")
         
     def speak_with_gtts(self, text, lang='en'):
         try:
             import gtts
             print(f"Generating speech: {text}")
             
-            # Generate speech
-            tts = gtts.gTTS(text=text, lang=lang, slow=False)
-            
-            # Create temporary file
-            temp_dir = tempfile.gettempdir()
-            temp_file = os.path.join(temp_dir, f"tts_audio_{int(time.time())}.mp3")
+            # Generate speech in memory (skipped entirely when this text was spoken before)
+            audio = get_audio_cache().audio("gtts", text, lambda: gtts_audio(text, lang), lang=lang)
+            print(f"Audio size: {len(audio)} bytes")
             
-            # Save audio
-            tts.save(temp_file)
-            print(f"Audio saved to: {temp_file}")
-            
-            # Verify file exists
-            if os.path.exists(temp_file):
-                print(f"File size: {os.path.getsize(temp_file)} bytes")
-                # Play with animation
-                self._play_with_animation(temp_file, text)
-            else:
-                print("Error: Audio file was not created")
+            # Play with animation straight from the buffer
+            self._play_with_animation(io.BytesIO(audio), text)
                 
         except ImportError:
             print("Google TTS not installed. Install with: pip install gtts")
         except Exception as e:
             print(f"Error in Google TTS: {e}")
     
-    def _play_with_animation(self, audio_file, text):
+    def _play_with_animation(self, audio, text):
         try:
-            # Load and play audio
-            pygame.mixer.music.load(audio_file)
+            # Decode once for lip sync, then load and play audio
+            envelope = AmplitudeEnvelope.from_audio(audio)
+            pygame.mixer.music.load(audio, "mp3")
             pygame.mixer.music.play()
             
             # Create animation
-            self._create_animation(text)
+            self._create_animation(text, envelope, VisemeTimeline.estimate(text, envelope))
             
         except Exception as e:
             print(f"Error playing audio: {e}")
         finally:
-            # Clean up
-            try:
-                if os.path.exists(audio_file):
-                    # Wait a bit before deleting to ensure playback is done
-                    time.sleep(1)
-                    os.unlink(audio_file)
-                    print("Temporary file cleaned up")
-            except Exception as e:
-                print(f"Could not delete temp file: {e}")
+            pygame.mixer.music.unload()
     
-    def _create_animation(self, text):
-        fig, ax = plt.subplots(figsize=(10, 8))
+    def _create_animation(self, text, envelope, visemes):
+        fig, ax = plt.subplots(figsize=self.figsize)
+        
+        def lipsync(t_ms):
+            # Check if music is still playing; viseme and loudness at the current playback position
+            if pygame.mixer.music.get_busy():
+                return visemes.viseme_at(t_ms), envelope.at(t_ms)
+            return None
+        
+        update = self.build_scene(ax, lipsync, text)
+        
+        def animate(frame):
+            return update(pygame.mixer.music.get_pos())
+        
+        ani = animation.FuncAnimation(fig, animate, interval=50, blit=True, repeat=True)
+        plt.tight_layout()
+        plt.show()
+    
+    def build_scene(self, ax, lipsync, text):
+        """Draw the face and caption on ax; returns update(t_ms), which poses it from lipsync(t_ms)"""
         ax.set_xlim(-2, 2)
         ax.set_ylim(-2, 2)
         ax.set_aspect('equal')
@@ -165,20 +213,10 @@ class FixedGTTSAnimatedSpeaker:
         ax.text(0, 1.8, 'Google TTS Speaking', ha='center', fontsize=14, color='white', weight='bold')
         ax.text(0, -1.8, f'"{text[:50]}..."', ha='center', fontsize=10, color='lightgray', style='italic')
         
-        frame_count = [0]
-        
-        def animate(frame):
-            frame_count[0] += 1
-            
-            # Check if music is still playing
-            if pygame.mixer.music.get_busy():
-                # Animate mouth with realistic movement
-                t = frame_count[0] * 0.2
-                mouth_width = 0.4 + 0.3 * abs(np.sin(t * 2))
-                mouth_height = 0.2 * abs(np.sin(t * 3))
-                
-                x = np.linspace(-mouth_width, mouth_width, 20)
-                y = mouth_height * np.sin(np.pi * x / mouth_width) - 0.5
+        def update(t_ms):
+            speech = lipsync(t_ms)
+            if speech:
+                x, y = mouth_outline(*speech, 0.7, 0.4, -0.5, 20)
                 mouth_line.set_data(x, y)
             else:
                 # Neutral mouth
@@ -188,139 +226,76 @@ class FixedGTTSAnimatedSpeaker:
             
             return mouth_line,
         
-        ani = animation.FuncAnimation(fig, animate, interval=50, blit=True, repeat=True)
-        plt.tight_layout()
-        plt.show()
+        return update
+    
+    def export_video(self, text, output, lang='en', fps=video_export.fps):
+        """Render the utterance to an MP4 without a display; returns the frame count"""
+        audio = get_audio_cache().audio("gtts", text, lambda: gtts_audio(text, lang), lang=lang)
+        envelope = AmplitudeEnvelope.from_audio(audio)
+        lipsync = video_export.envelope_lipsync(envelope, VisemeTimeline.estimate(text, envelope))
+        return video_export.render_video(self.figsize, lambda ax, lipsync: self.build_scene(ax, lipsync, text),
+                                         lipsync, audio, envelope.duration_ms, output, fps)
 
 # Method 3: Edge TTS (Alternative to Coqui)
 class EdgeTTSAnimatedSpeaker:
+    figsize = (12, 10)
+    
     def __init__(self):
-        pygame.mixer.init()
+        get_engines().get("mixer")
         
-    def speak_advanced(self, text, voice="en-US-AriaNeural"):
+    def speak_advanced(self, text, voice="en-US-AriaNeural", stream=False):
         try:
             import edge_tts
-            import asyncio
             
             print(f"Generating advanced speech: {text}")
             
-            async def generate_speech():
-                communicate = edge_tts.Communicate(text, voice)
-                temp_file = os.path.join(tempfile.gettempdir(), f"edge_tts_{int(time.time())}.mp3")
-                await communicate.save(temp_file)
-                return temp_file
+            if stream:
+                # Sentences are synthesized in the background; the first one starts playing as soon as it is ready
+                player = StreamingPlayer(synthesize_chunks(text, lambda s: edge_sentence(s, voice)))
+                player.started.wait()
+                if player.error is None:
+                    self._advanced_animation(None, text, voice, player)
+                return
             
-            # Generate speech
-            audio_file = asyncio.run(generate_speech())
+            # Generate speech in memory (skipped entirely when this text was spoken before)
+            audio, words = edge_speech(text, voice)
+            print(f"Edge TTS audio generated: {len(audio)} bytes, {len(words)} word timings")
             
-            if os.path.exists(audio_file):
-                print(f"Edge TTS audio generated: {audio_file}")
-                # Play with advanced animation
-                self._advanced_animation(audio_file, text)
-            else:
-                print("Error: Edge TTS file not created")
+            # Play with advanced animation straight from the buffer
+            self._advanced_animation(io.BytesIO(audio), text, voice, words=words)
                 
         except ImportError:
             print("Edge TTS not installed. Install with: pip install edge-tts")
         except Exception as e:
             print(f"Error with Edge TTS: {e}")
     
-    def _advanced_animation(self, audio_file, text):
+    def _advanced_animation(self, audio, text, voice, player=None, words=None):
         try:
-            # Load and play audio
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
+            # Load and play audio, unless a streaming player is already feeding the mixer
+            if player is None:
+                # Word timings from the voice service when it sent them, otherwise an estimate from the text
+                envelope = AmplitudeEnvelope.from_audio(audio)
+                visemes = VisemeTimeline.from_words(words) if words else VisemeTimeline.estimate(text, envelope)
+                pygame.mixer.music.load(audio, "mp3")
+                pygame.mixer.music.play()
+                is_playing, position = pygame.mixer.music.get_busy, pygame.mixer.music.get_pos
+            else:
+                envelope, visemes = player.envelope, player.visemes
+                is_playing, position = player.get_busy, player.position_ms
             
             # Create advanced animation
-            fig, ax = plt.subplots(figsize=(12, 10))
-            ax.set_xlim(-3, 3)
-            ax.set_ylim(-3, 3)
-            ax.set_aspect('equal')
-            ax.axis('off')
-            ax.set_facecolor('black')
-            
-            # Advanced character
-            # Face outline
-            face = plt.Circle((0, 0), 2, fill=False, linewidth=4, color='lime')
-            ax.add_patch(face)
-            
-            # Eyes with more detail
-            left_eye = plt.Circle((-0.7, 0.5), 0.3, color='white', alpha=0.9)
-            right_eye = plt.Circle((0.7, 0.5), 0.3, color='white', alpha=0.9)
-            left_pupil = plt.Circle((-0.7, 0.5), 0.15, color='green')
-            right_pupil = plt.Circle((0.7, 0.5), 0.15, color='green')
-            left_highlight = plt.Circle((-0.65, 0.6), 0.05, color='white')
-            right_highlight = plt.Circle((0.75, 0.6), 0.05, color='white')
-            
-            ax.add_patch(left_eye)
-            ax.add_patch(right_eye)
-            ax.add_patch(left_pupil)
-            ax.add_patch(right_pupil)
-            ax.add_patch(left_highlight)
-            ax.add_patch(right_highlight)
-            
-            # Eyebrows
-            left_brow, = ax.plot([-1, -0.4], [0.9, 0.9], color='lime', linewidth=4)
-            right_brow, = ax.plot([0.4, 1], [0.9, 0.9], color='lime', linewidth=4)
+            fig, ax = plt.subplots(figsize=self.figsize)
             
-            # Nose
-            nose, = ax.plot([0, 0], [0.2, -0.2], color='lime', linewidth=3)
+            def lipsync(t_ms):
+                # Mouth shape and loudness at the current playback position
+                if is_playing():
+                    return visemes.viseme_at(t_ms), envelope.at(t_ms)
+                return None
             
-            # Mouth (animated)
-            mouth_line, = ax.plot([], [], color='red', linewidth=6)
-            
-            # Title and text
-            ax.text(0, 2.5, 'Advanced AI Speaker', ha='center', fontsize=16, color='white', weight='bold')
-            ax.text(0, -2.7, f'Voice: {voice}', ha='center', fontsize=10, color='gray')
-            
-            frame_count = [0]
+            update = self.build_scene(ax, lipsync, voice)
             
             def animate(frame):
-                frame_count[0] += 1
-                
-                if pygame.mixer.music.get_busy():
-                    # Complex mouth animation
-                    t = frame_count[0] * 0.15
-                    
-                    # Multiple frequency components for realistic speech
-                    base_width = 0.6
-                    width_mod = 0.4 * (np.sin(t * 2) + 0.5 * np.sin(t * 5) + 0.3 * np.sin(t * 8))
-                    mouth_width = base_width + abs(width_mod)
-                    
-                    base_height = 0.3
-                    height_mod = 0.25 * (np.sin(t * 3) + 0.3 * np.sin(t * 7))
-                    mouth_height = base_height * abs(height_mod)
-                    
-                    # Create mouth shape
-                    x = np.linspace(-mouth_width, mouth_width, 25)
-                    y = mouth_height * np.sin(np.pi * x / mouth_width) - 0.8
-                    mouth_line.set_data(x, y)
-                    
-                    # Expressive eyebrows
-                    brow_lift = 0.15 * np.sin(t * 0.7)
-                    left_brow.set_ydata([0.9 + brow_lift, 0.9 + brow_lift])
-                    right_brow.set_ydata([0.9 + brow_lift, 0.9 + brow_lift])
-                    
-                    # Eye movement
-                    eye_x = 0.03 * np.sin(t * 0.4)
-                    left_pupil.center = (-0.7 + eye_x, 0.5)
-                    right_pupil.center = (0.7 + eye_x, 0.5)
-                    left_highlight.center = (-0.65 + eye_x, 0.6)
-                    right_highlight.center = (0.75 + eye_x, 0.6)
-                    
-                else:
-                    # Neutral expression
-                    x = np.linspace(-0.4, 0.4, 25)
-                    y = np.zeros(25) - 0.8
-                    mouth_line.set_data(x, y)
-                    left_brow.set_ydata([0.9, 0.9])
-                    right_brow.set_ydata([0.9, 0.9])
-                    left_pupil.center = (-0.7, 0.5)
-                    right_pupil.center = (0.7, 0.5)
-                    left_highlight.center = (-0.65, 0.6)
-                    right_highlight.center = (0.75, 0.6)
-                
-                return mouth_line, left_brow, right_brow
+                return update(position())
             
             ani = animation.FuncAnimation(fig, animate, interval=30, blit=False, repeat=True)
             plt.tight_layout()
@@ -329,19 +304,112 @@ class EdgeTTSAnimatedSpeaker:
         except Exception as e:
             print(f"Animation error: {e}")
         finally:
-            # Cleanup
-            try:
-                time.sleep(1)
-                if os.path.exists(audio_file):
-                    os.unlink(audio_file)
-                    print("Advanced TTS file cleaned up")
-            except:
-                pass
+            if player is not None:
+                # Closing the window ends the utterance
+                player.stop()
+            else:
+                pygame.mixer.music.unload()
+
+    def build_scene(self, ax, lipsync, voice):
+        """Draw the character on ax; returns update(t_ms), which poses it from lipsync(t_ms)"""
+        ax.set_xlim(-3, 3)
+        ax.set_ylim(-3, 3)
+        ax.set_aspect('equal')
+        ax.axis('off')
+        ax.set_facecolor('black')
+        
+        # Advanced character
+        # Face outline
+        face = plt.Circle((0, 0), 2, fill=False, linewidth=4, color='lime')
+        ax.add_patch(face)
+        
+        # Eyes with more detail
+        left_eye = plt.Circle((-0.7, 0.5), 0.3, color='white', alpha=0.9)
+        right_eye = plt.Circle((0.7, 0.5), 0.3, color='white', alpha=0.9)
+        left_pupil = plt.Circle((-0.7, 0.5), 0.15, color='green')
+        right_pupil = plt.Circle((0.7, 0.5), 0.15, color='green')
+        left_highlight = plt.Circle((-0.65, 0.6), 0.05, color='white')
+        right_highlight = plt.Circle((0.75, 0.6), 0.05, color='white')
+        
+        ax.add_patch(left_eye)
+        ax.add_patch(right_eye)
+        ax.add_patch(left_pupil)
+        ax.add_patch(right_pupil)
+        ax.add_patch(left_highlight)
+        ax.add_patch(right_highlight)
+        
+        # Eyebrows
+        left_brow, = ax.plot([-1, -0.4], [0.9, 0.9], color='lime', linewidth=4)
+        right_brow, = ax.plot([0.4, 1], [0.9, 0.9], color='lime', linewidth=4)
+        
+        # Nose
+        nose, = ax.plot([0, 0], [0.2, -0.2], color='lime', linewidth=3)
+        
+        # Mouth (animated)
+        mouth_line, = ax.plot([], [], color='red', linewidth=6)
+        
+        # Title and text
+        ax.text(0, 2.5, 'Advanced AI Speaker', ha='center', fontsize=16, color='white', weight='bold')
+        ax.text(0, -2.7, f'Voice: {voice}', ha='center', fontsize=10, color='gray')
+        
+        def update(t_ms):
+            speech = lipsync(t_ms)
+            if speech:
+                viseme, level = speech
+                x, y = mouth_outline(viseme, level, 1.0, 0.5, -0.8, 25)
+                mouth_line.set_data(x, y)
+                
+                # Expressive eyebrows
+                brow_lift = 0.15 * level
+                left_brow.set_ydata([0.9 + brow_lift, 0.9 + brow_lift])
+                right_brow.set_ydata([0.9 + brow_lift, 0.9 + brow_lift])
+                
+                # Eye movement, on the same clock as the mouth
+                eye_x = 0.03 * np.sin(t_ms * 0.002)
+                left_pupil.center = (-0.7 + eye_x, 0.5)
+                right_pupil.center = (0.7 + eye_x, 0.5)
+                left_highlight.center = (-0.65 + eye_x, 0.6)
+                right_highlight.center = (0.75 + eye_x, 0.6)
+                
+            else:
+                # Neutral expression
+                x = np.linspace(-0.4, 0.4, 25)
+                y = np.zeros(25) - 0.8
+                mouth_line.set_data(x, y)
+                left_brow.set_ydata([0.9, 0.9])
+                right_brow.set_ydata([0.9, 0.9])
+                left_pupil.center = (-0.7, 0.5)
+                right_pupil.center = (0.7, 0.5)
+                left_highlight.center = (-0.65, 0.6)
+                right_highlight.center = (0.75, 0.6)
+            
+            return mouth_line, left_brow, right_brow, left_pupil, right_pupil, left_highlight, right_highlight
+        
+        return update
+    
+    def export_video(self, text, output, voice="en-US-AriaNeural", fps=video_export.fps):
+        """Render the utterance to an MP4 without a display; returns the frame count"""
+        audio, words = edge_speech(text, voice)
+        envelope = AmplitudeEnvelope.from_audio(audio)
+        visemes = VisemeTimeline.from_words(words) if words else VisemeTimeline.estimate(text, envelope)
+        lipsync = video_export.envelope_lipsync(envelope, visemes)
+        return video_export.render_video(self.figsize, lambda ax, lipsync: self.build_scene(ax, lipsync, voice),
+                                         lipsync, audio, envelope.duration_ms, output, fps)
 
 def main():
     print("🎤 AI Text-to-Speech with Animation")
     print("=" * 40)
     
+    # Warm the mixer while the user types; engines are then shared by every utterance
+    engines = get_engines()
+    engines.preload(["mixer"])
+    speakers = {}
+    
+    def speaker_for(cls):
+        if cls not in speakers:
+            speakers[cls] = cls()
+        return speakers[cls]
+    
     while True:
         print("\nChoose TTS method:")
         print("1. Simple Offline TTS (Always works)")
@@ -354,14 +422,12 @@ def main():
         if choice == "1":
             text = input("Enter text to speak: ")
             if text.strip():
-                speaker = SimpleAnimatedSpeaker()
-                speaker.speak_with_animation(text)
+                speaker_for(SimpleAnimatedSpeaker).speak_with_animation(text)
         
         elif choice == "2":
             text = input("Enter text to speak: ")
             if text.strip():
-                speaker = FixedGTTSAnimatedSpeaker()
-                speaker.speak_with_gtts(text)
+                speaker_for(FixedGTTSAnimatedSpeaker).speak_with_gtts(text)
         
         elif choice == "3":
             text = input("Enter text to speak: ")
@@ -370,11 +436,11 @@ def main():
             if not voice:
                 voice = "en-US-AriaNeural"
             if text.strip():
-                speaker = EdgeTTSAnimatedSpeaker()
-                speaker.speak_advanced(text, voice)
+                speaker_for(EdgeTTSAnimatedSpeaker).speak_advanced(text, voice, stream=True)
         
         elif choice == "4":
             print("Goodbye! 👋")
+            engines.shutdown()
             break
         
         else:
@@ -1,75 +1,141 @@
 import pygame
-import pyttsx3
-import threading
-import time
 import math
 
+from speech_queue import SpeechWorker
+from timeline import Timeline, ease_out
+
+# Character sprite bounds, and where the head centre sits inside them
+SPRITE_SIZE = (172, 290)
+SPRITE_ORIGIN = (86, 86)
+# Animation timings, in seconds
+blink_interval = 3.0
+blink_duration = 0.17
+mouth_flap = 0.1
+
 class CartoonCharacter:
-    def __init__(self, x, y):
+    def __init__(self, x, y, timeline):
         self.x = x
         self.y = y
+        self.timeline = timeline
         self.is_speaking = False
         self.mouth_open = False
-        self.blink_timer = 0
+        self.mouth_opening = 0.0
         self.eye_closed = False
         self.bounce_offset = 0
-        self.bounce_speed = 0.1
+        self.bounce_phase = 0.0
+        self.bounce_speed = 10  # radians per second
+        # Pre-rendered states, built on first draw (converting needs the display mode set)
+        self.sprites = None
+        # (sprite state, screen rect) as last blitted
+        self.drawn = None
+        self.timeline.after(blink_interval, self._blink)
         
-    def update(self):
+    def update(self, dt):
         # Bouncing animation when speaking
         if self.is_speaking:
-            self.bounce_offset = math.sin(pygame.time.get_ticks() * 0.01) * 5
-            
-        # Blinking animation
-        self.blink_timer += 1
-        if self.blink_timer > 180:  # Blink every 3 seconds at 60 FPS
-            self.eye_closed = True
-        if self.blink_timer > 190:
-            self.eye_closed = False
-            self.blink_timer = 0
+            self.bounce_phase += dt * self.bounce_speed
+            self.bounce_offset = math.sin(self.bounce_phase) * 5
+        self.mouth_open = self.mouth_opening > 0.5
     
-    def draw(self, screen):
-        current_y = self.y + self.bounce_offset
-        
+    def _blink(self):
+        self.eye_closed = True
+        self.timeline.after(blink_duration, self._open_eyes)
+    
+    def _open_eyes(self):
+        self.eye_closed = False
+        self.timeline.after(blink_interval, self._blink)
+    
+    def _flap(self):
+        """Open and close the mouth once, and keep going for as long as the character speaks"""
+        if not self.is_speaking:
+            self.timeline.tween(self, "mouth_opening", 0.0, mouth_flap)
+            return
+        self.timeline.tween(self, "mouth_opening", 1.0, mouth_flap, on_done=lambda: self.timeline.tween(
+            self, "mouth_opening", 0.0, mouth_flap, on_done=self._flap))
+    
+    def on_speech(self, event, value):
+        """React to a SpeechWorker event"""
+        if event == "start":
+            self.is_speaking = True
+            self._flap()
+        elif event == "word":
+            # Restart the flap so the mouth opens on each word
+            self._flap()
+        elif event == "end":
+            self.is_speaking = False
+            self.timeline.tween(self, "mouth_opening", 0.0, mouth_flap)
+            self.timeline.tween(self, "bounce_offset", 0, 0.2, ease=ease_out)
+    
+    def _build_sprites(self):
+        """Pre-render the whole character once per (eyes closed, mouth open) state, relative to its head centre"""
+        self.sprites = {}
+        for eye_closed in (False, True):
+            for mouth_open in (False, True):
+                sprite = pygame.Surface(SPRITE_SIZE, pygame.SRCALPHA)
+                self._draw_parts(sprite, *SPRITE_ORIGIN, eye_closed, mouth_open)
+                self.sprites[eye_closed, mouth_open] = sprite.convert_alpha()
+    
+    def _draw_parts(self, surface, x, y, eye_closed, mouth_open):
         # Draw head (circle)
-        pygame.draw.circle(screen, (255, 220, 177), (self.x, int(current_y)), 80)
-        pygame.draw.circle(screen, (0, 0, 0), (self.x, int(current_y)), 80, 3)
+        pygame.draw.circle(surface, (255, 220, 177), (x, y), 80)
+        pygame.draw.circle(surface, (0, 0, 0), (x, y), 80, 3)
         
         # Draw eyes
-        if not self.eye_closed:
+        if not eye_closed:
             # Left eye
-            pygame.draw.circle(screen, (255, 255, 255), (self.x - 25, int(current_y) - 20), 15)
-            pygame.draw.circle(screen, (0, 0, 0), (self.x - 25, int(current_y) - 20), 15, 2)
-            pygame.draw.circle(screen, (0, 0, 0), (self.x - 25, int(current_y) - 20), 8)
+            pygame.draw.circle(surface, (255, 255, 255), (x - 25, y - 20), 15)
+            pygame.draw.circle(surface, (0, 0, 0), (x - 25, y - 20), 15, 2)
+            pygame.draw.circle(surface, (0, 0, 0), (x - 25, y - 20), 8)
             
             # Right eye
-            pygame.draw.circle(screen, (255, 255, 255), (self.x + 25, int(current_y) - 20), 15)
-            pygame.draw.circle(screen, (0, 0, 0), (self.x + 25, int(current_y) - 20), 15, 2)
-            pygame.draw.circle(screen, (0, 0, 0), (self.x + 25, int(current_y) - 20), 8)
+            pygame.draw.circle(surface, (255, 255, 255), (x + 25, y - 20), 15)
+            pygame.draw.circle(surface, (0, 0, 0), (x + 25, y - 20), 15, 2)
+            pygame.draw.circle(surface, (0, 0, 0), (x + 25, y - 20), 8)
         else:
             # Closed eyes (lines)
-            pygame.draw.line(screen, (0, 0, 0), (self.x - 35, int(current_y) - 20), (self.x - 15, int(current_y) - 20), 3)
-            pygame.draw.line(screen, (0, 0, 0), (self.x + 15, int(current_y) - 20), (self.x + 35, int(current_y) - 20), 3)
+            pygame.draw.line(surface, (0, 0, 0), (x - 35, y - 20), (x - 15, y - 20), 3)
+            pygame.draw.line(surface, (0, 0, 0), (x + 15, y - 20), (x + 35, y - 20), 3)
         
         # Draw nose
-        pygame.draw.circle(screen, (255, 200, 150), (self.x, int(current_y) - 5), 5)
+        pygame.draw.circle(surface, (255, 200, 150), (x, y - 5), 5)
         
         # Draw mouth (changes when speaking)
-        if self.is_speaking and self.mouth_open:
+        if mouth_open:
             # Open mouth (oval)
-            pygame.draw.ellipse(screen, (50, 0, 0), (self.x - 15, int(current_y) + 20, 30, 20))
-            pygame.draw.ellipse(screen, (0, 0, 0), (self.x - 15, int(current_y) + 20, 30, 20), 2)
+            pygame.draw.ellipse(surface, (50, 0, 0), (x - 15, y + 20, 30, 20))
+            pygame.draw.ellipse(surface, (0, 0, 0), (x - 15, y + 20, 30, 20), 2)
         else:
             # Closed mouth (line)
-            pygame.draw.line(screen, (0, 0, 0), (self.x - 15, int(current_y) + 25), (self.x + 15, int(current_y) + 25), 3)
+            pygame.draw.line(surface, (0, 0, 0), (x - 15, y + 25), (x + 15, y + 25), 3)
         
         # Draw body (simple rectangle)
-        pygame.draw.rect(screen, (100, 150, 255), (self.x - 40, int(current_y) + 80, 80, 120))
-        pygame.draw.rect(screen, (0, 0, 0), (self.x - 40, int(current_y) + 80, 80, 120), 3)
+        pygame.draw.rect(surface, (100, 150, 255), (x - 40, y + 80, 80, 120))
+        pygame.draw.rect(surface, (0, 0, 0), (x - 40, y + 80, 80, 120), 3)
         
         # Draw arms
-        pygame.draw.line(screen, (255, 220, 177), (self.x - 40, int(current_y) + 100), (self.x - 70, int(current_y) + 140), 8)
-        pygame.draw.line(screen, (255, 220, 177), (self.x + 40, int(current_y) + 100), (self.x + 70, int(current_y) + 140), 8)
+        pygame.draw.line(surface, (255, 220, 177), (x - 40, y + 100), (x - 70, y + 140), 8)
+        pygame.draw.line(surface, (255, 220, 177), (x + 40, y + 100), (x + 70, y + 140), 8)
+    
+    def draw(self, screen, background):
+        """Blit the cached sprite for the current state; returns the screen rects that changed"""
+        if self.sprites is None:
+            self._build_sprites()
+        key = (self.eye_closed, self.is_speaking and self.mouth_open)
+        rect = pygame.Rect((self.x - SPRITE_ORIGIN[0], int(self.y + self.bounce_offset) - SPRITE_ORIGIN[1]),
+                           SPRITE_SIZE)
+        if (key, rect) == self.drawn:
+            return []
+        
+        dirty = rect
+        if self.drawn is not None:
+            # Erase where it was last frame
+            old_rect = self.drawn[1]
+            screen.blit(background, old_rect, old_rect)
+            dirty = rect.union(old_rect)
+        screen.blit(background, rect, rect)
+        screen.blit(self.sprites[key], rect)
+        self.drawn = (key, rect)
+        return [dirty]
 
 class TextToSpeechApp:
     def __init__(self):
@@ -78,104 +144,133 @@ class TextToSpeechApp:
         pygame.display.set_caption("Animated Cartoon Character - Text to Speech")
         self.clock = pygame.time.Clock()
         
-        # Initialize TTS engine
-        self.tts_engine = pyttsx3.init()
-        self.tts_engine.setProperty('rate', 150)  # Speaking speed
-        self.tts_engine.setProperty('volume', 0.9)  # Volume level
+        # One TTS worker owns the engine; utterances are queued to it
+        self.speech = SpeechWorker(rate=150, volume=0.9)  # Speaking speed, volume level
+        
+        # Every animation runs on this timeline, advanced once per frame
+        self.timeline = Timeline()
         
         # Create character
-        self.character = CartoonCharacter(400, 200)
+        self.character = CartoonCharacter(400, 200, self.timeline)
         
         # Text input
         self.input_text = ""
-        self.font = pygame.font.Font(None, 32)
+        self.input_rect = pygame.Rect(50, 450, 700, 40)
+        
+        # Fonts and fixed labels are created once; the screen is only updated where something changed
+        self.fonts = {}
+        self.labels = {}
+        self.background = None
+        self.drawn_input = None
+        self.drawn_speaking = None
         
         self.running = True
         
-    def animate_mouth(self, duration):
-        """Animate mouth movement during speech"""
-        start_time = time.time()
-        while time.time() - start_time < duration:
-            self.character.mouth_open = not self.character.mouth_open
-            time.sleep(0.1)  # Mouth movement speed
-        self.character.is_speaking = False
-        self.character.mouth_open = False
-    
     def speak_text(self, text):
-        """Convert text to speech and animate character"""
+        """Speak the text, cutting off whatever the character was still saying"""
         if not text.strip():
             return
-            
-        self.character.is_speaking = True
-        
-        # Estimate speaking duration (rough calculation)
-        words = len(text.split())
-        duration = words * 0.5  # Approximate 0.5 seconds per word
-        
-        # Start mouth animation in separate thread
-        animation_thread = threading.Thread(target=self.animate_mouth, args=(duration,))
-        animation_thread.daemon = True
-        animation_thread.start()
-        
-        # Start TTS in separate thread
-        def speak():
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-        
-        tts_thread = threading.Thread(target=speak)
-        tts_thread.daemon = True
-        tts_thread.start()
+        self.speech.say(text, interrupt=True)
     
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+                # The window contents were lost; repaint everything on the next frame
+                self.background = None
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
                     # Speak the text when Enter is pressed
                     self.speak_text(self.input_text)
                     self.input_text = ""
+                elif event.key == pygame.K_ESCAPE:
+                    # Stop talking and forget anything queued
+                    self.speech.cancel()
                 elif event.key == pygame.K_BACKSPACE:
                     self.input_text = self.input_text[:-1]
                 else:
                     self.input_text += event.unicode
     
-    def draw(self):
-        # Clear screen
-        self.screen.fill((135, 206, 235))  # Sky blue background
-        
-        # Draw character
-        self.character.draw(self.screen)
+    def font(self, size):
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+    
+    def render_text(self, text, size, color):
+        """Rendered surface for a fixed label, kept for reuse"""
+        key = (text, size, color)
+        if key not in self.labels:
+            self.labels[key] = self.font(size).render(text, True, color).convert_alpha()
+        return self.labels[key]
+    
+    def _build_background(self):
+        """Everything that never changes, drawn once and used to erase dirty areas"""
+        background = pygame.Surface(self.screen.get_size()).convert()
+        background.fill((135, 206, 235))  # Sky blue background
         
         # Draw text input box
-        input_rect = pygame.Rect(50, 450, 700, 40)
-        pygame.draw.rect(self.screen, (255, 255, 255), input_rect)
-        pygame.draw.rect(self.screen, (0, 0, 0), input_rect, 2)
-        
-        # Draw input text
-        text_surface = self.font.render(self.input_text, True, (0, 0, 0))
-        self.screen.blit(text_surface, (input_rect.x + 5, input_rect.y + 5))
+        pygame.draw.rect(background, (255, 255, 255), self.input_rect)
+        pygame.draw.rect(background, (0, 0, 0), self.input_rect, 2)
         
         # Draw instructions
         instruction_text = "Type your message and press Enter to make the character speak!"
-        instruction_surface = pygame.font.Font(None, 24).render(instruction_text, True, (0, 0, 0))
-        self.screen.blit(instruction_surface, (50, 420))
+        background.blit(self.render_text(instruction_text, 24, (0, 0, 0)), (50, 420))
+        return background
+    
+    def draw(self):
+        if self.background is None:
+            self.background = self._build_background()
+            self.screen.blit(self.background, (0, 0))
+            self.drawn_input = self.drawn_speaking = None
+            self.character.drawn = None
+            full_redraw = True
+        else:
+            full_redraw = False
+        
+        # Draw character
+        dirty = self.character.draw(self.screen, self.background)
+        
+        # Draw input text, only when it changed
+        if self.input_text != self.drawn_input:
+            inner = self.input_rect.inflate(-4, -4)
+            self.screen.blit(self.background, inner, inner)
+            text_surface = self.font(32).render(self.input_text, True, (0, 0, 0))
+            self.screen.set_clip(inner)
+            self.screen.blit(text_surface, (self.input_rect.x + 5, self.input_rect.y + 5))
+            self.screen.set_clip(None)
+            self.drawn_input = self.input_text
+            dirty.append(inner)
         
         # Draw speaking indicator
-        if self.character.is_speaking:
-            speaking_text = "Speaking..."
-            speaking_surface = pygame.font.Font(None, 28).render(speaking_text, True, (255, 0, 0))
-            self.screen.blit(speaking_surface, (350, 50))
+        if self.character.is_speaking != self.drawn_speaking:
+            speaking_surface = self.render_text("Speaking...", 28, (255, 0, 0))
+            speaking_rect = speaking_surface.get_rect(topleft=(350, 50))
+            self.screen.blit(self.background, speaking_rect, speaking_rect)
+            if self.character.is_speaking:
+                self.screen.blit(speaking_surface, speaking_rect)
+            self.drawn_speaking = self.character.is_speaking
+            dirty.append(speaking_rect)
         
-        pygame.display.flip()
+        if full_redraw:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
     
     def run(self):
         while self.running:
             self.handle_events()
-            self.character.update()
+            for event, value in self.speech.poll():
+                if event == "error":
+                    print(f"Text-to-speech is unavailable: {value}")
+                else:
+                    self.character.on_speech(event, value)
+            dt = self.timeline.update()
+            self.character.update(dt)
             self.draw()
             self.clock.tick(60)  # 60 FPS
         
+        self.speech.close()
         pygame.quit()
 
 # Main execution
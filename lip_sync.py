@@ -0,0 +1,133 @@
+# Amplitude-driven lip sync.
+#
+# The audio is decoded once and reduced to one RMS level per short window with
+# NumPy; the render loop then asks for the level at the current playback
+# position (pygame.mixer.music.get_pos() or a StreamingPlayer clock), which is
+# a single array index, so the mouth follows the sound rather than the frame
+# counter.
+
+import io
+import wave
+
+import numpy as np
+
+# Envelope resolution; one value per window
+window_ms = 20
+# Levels are scaled against this percentile so a few loud peaks don't flatten everything else
+reference_percentile = 95
+
+
+def _to_float(samples):
+    if samples.dtype.kind == "f":
+        return samples.astype(np.float32)
+    if samples.dtype.kind == "u":
+        half = np.iinfo(samples.dtype).max / 2
+        return (samples.astype(np.float32) - half) / half
+    return samples.astype(np.float32) / -np.iinfo(samples.dtype).min
+
+
+def sound_samples(sound):
+    """(mono float32 samples, sample rate) of a pygame Sound, at the mixer's format"""
+    import pygame
+    import pygame.sndarray
+
+    samples = _to_float(pygame.sndarray.array(sound))
+    rate, _, channels = pygame.mixer.get_init()
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def decode_audio(audio):
+    """(mono float32 samples in -1..1, sample rate) from a WAV/MP3 path, bytes or file object"""
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            audio = f.read()
+    elif hasattr(audio, "read"):
+        position = audio.tell()
+        data = audio.read()
+        audio.seek(position)
+        audio = data
+
+    if audio[:4] != b"RIFF":
+        # Anything else is decoded by the (already warm) pygame mixer
+        import pygame
+        return sound_samples(pygame.mixer.Sound(file=io.BytesIO(audio)))
+
+    with wave.open(io.BytesIO(audio), "rb") as f:
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[f.getsampwidth()]
+        samples = _to_float(np.frombuffer(f.readframes(f.getnframes()), dtype=dtype))
+        channels, rate = f.getnchannels(), f.getframerate()
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+class AmplitudeEnvelope:
+    """Per-window RMS levels of an utterance, looked up by playback time in O(1)"""
+
+    def __init__(self, window_ms=window_ms):
+        self.window_ms = window_ms
+        self.levels = np.zeros(0, dtype=np.float32)
+        self.reference = 1e-4
+        # Unsmoothed levels, and the samples of a window that the last chunk left unfinished
+        self.raw = np.zeros(0, dtype=np.float32)
+        self._partial = np.zeros(0, dtype=np.float32)
+        # Exact length of the audio seen so far, from the sample counts
+        self.audio_ms = 0.0
+        self.sample_rate = None
+
+    @classmethod
+    def from_audio(cls, audio, window_ms=window_ms):
+        envelope = cls(window_ms)
+        samples, sample_rate = decode_audio(audio)
+        envelope.extend(samples, sample_rate)
+        envelope.finish()
+        return envelope
+
+    def extend(self, samples, sample_rate):
+        """Append the levels for more audio (e.g. the next streamed sentence).
+
+        A window left unfinished at the end is carried over to the next call, so
+        the windows stay aligned with the audio across chunks.
+        """
+        self.sample_rate = sample_rate
+        self.audio_ms += len(samples) / sample_rate * 1000
+        window = max(1, int(sample_rate * self.window_ms / 1000))
+        samples = np.concatenate([self._partial, np.asarray(samples, dtype=np.float32)])
+        count = len(samples) // window
+        self._partial = samples[count * window:]
+        if count:
+            self._add_windows(np.sqrt(np.mean(samples[:count * window].reshape(count, window) ** 2, axis=1)))
+
+    def finish(self):
+        """Level the unfinished last window, padded with silence, once no more audio will follow"""
+        if len(self._partial):
+            window = max(1, int(self.sample_rate * self.window_ms / 1000))
+            padded = np.zeros(window, dtype=np.float32)
+            padded[:len(self._partial)] = self._partial
+            self._partial = np.zeros(0, dtype=np.float32)
+            self._add_windows(np.sqrt(np.mean(padded ** 2, keepdims=True)))
+
+    def _add_windows(self, rms):
+        start = len(self.raw)
+        self.raw = np.concatenate([self.raw, rms.astype(np.float32)])
+        self.reference = max(self.reference, float(np.percentile(rms, reference_percentile)))
+        # A 3-window moving average takes the edge off frame-to-frame jitter; the previous last
+        # level only now has its right-hand neighbour, so it is smoothed again
+        lo = max(0, start - 1)
+        context = max(0, lo - 1)
+        padded = np.pad(self.raw[context:], 1)
+        smoothed = np.convolve(padded, np.ones(3, dtype=np.float32) / 3, mode="valid")[lo - context:]
+        self.levels = np.concatenate([self.levels[:lo], smoothed.astype(np.float32)])
+
+    @property
+    def duration_ms(self):
+        return len(self.levels) * self.window_ms
+
+    def at(self, position_ms):
+        """Mouth opening in 0..1 at position_ms into the audio (0 before the start and after the end)"""
+        index = int(position_ms // self.window_ms)
+        if index < 0 or index >= len(self.levels):
+            return 0.0
+        return min(1.0, float(self.levels[index]) / self.reference)
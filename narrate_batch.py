@@ -0,0 +1,201 @@
+# Narrate every scraped article to an audio file, offline and in parallel.
+#
+#   python narrate_batch.py [scraped_news] [--out narrated] [--engine pyttsx3|gtts|edge] [--workers N]
+#
+# Each article is synthesized in a worker process and written next to the
+# others under --out. narrated/manifest.json records the source hash, output
+# file and duration of every finished article, so an interrupted run picks up
+# where it stopped and unchanged articles are never synthesized twice.
+# (Articles kept in articles.db can be written out first with
+# `python article_store.py export`.)
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Defaults for the batch run
+source_dir = "scraped_news"
+out_dir = "narrated"
+default_engine = "pyttsx3"
+edge_voice = "en-US-AriaNeural"
+
+_EXTENSIONS = {"pyttsx3": "wav", "gtts": "mp3", "edge": "mp3"}
+
+# MPEG audio layer III tables, indexed by the header's version bits
+_MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def mp3_duration(data):
+    """Seconds of audio in an MP3, from its frame headers (no decoder or audio device needed)"""
+    i = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        i = 10 + size
+    seconds = 0.0
+    while i + 4 <= len(data):
+        b1, b2 = data[i + 1], data[i + 2]
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+        if (data[i] != 0xFF or b1 & 0xE0 != 0xE0 or version == 1 or layer != 1
+                or bitrate_index in (0, 15) or rate_index == 3):
+            i += 1
+            continue
+        bitrate = _MP3_BITRATES[version][bitrate_index] * 1000
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        seconds += samples / sample_rate
+        i += samples // 8 * bitrate // sample_rate + ((b2 >> 1) & 1)
+    return seconds
+
+
+def audio_duration(path):
+    try:
+        if path.endswith(".wav"):
+            with wave.open(path, "rb") as f:
+                return f.getnframes() / f.getframerate()
+        with open(path, "rb") as f:
+            return mp3_duration(f.read())
+    except (OSError, wave.Error, EOFError):
+        return None
+
+
+def article_text(path):
+    """The spoken part of a scraped article file (title line, url line, blank, then the text)"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    _, _, body = content.partition("\n\n")
+    return body.strip() or content.strip()
+
+
+def narrate_file(source, output, engine, voice=None, lang="en"):
+    """Runs in a worker process: synthesize one article to output, returns its duration in seconds"""
+    text = article_text(source)
+    tmp_path = f"{output}.tmp.{os.getpid()}.{_EXTENSIONS[engine]}"
+    try:
+        if engine == "pyttsx3":
+            from tts_engines import get_engines
+
+            # One driver per worker process, reused for every article it narrates
+            driver = get_engines().get("pyttsx3")
+            driver.save_to_file(text, tmp_path)
+            driver.runAndWait()
+        else:
+            from tts_cache import get_audio_cache
+            from tts_stream import edge_audio, gtts_audio
+
+            if engine == "edge":
+                audio = get_audio_cache().audio("edge", text, lambda: edge_audio(text, voice), voice=voice)
+            else:
+                audio = get_audio_cache().audio("gtts", text, lambda: gtts_audio(text, lang), lang=lang)
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+        if not os.path.exists(tmp_path) or not os.path.getsize(tmp_path):
+            raise RuntimeError(f"{engine} produced no audio for {source}")
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return audio_duration(output)
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class NarrationManifest:
+    """source file -> {"hash", "output", "duration_s", "engine", "narrated_at"}, saved after every article"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def is_done(self, source, source_hash, engine):
+        entry = self.entries.get(source)
+        return (entry is not None and entry["hash"] == source_hash and entry["engine"] == engine
+                and os.path.exists(entry["output"]))
+
+    def record(self, source, source_hash, output, duration, engine):
+        self.entries[source] = {
+            "hash": source_hash,
+            "output": output,
+            "duration_s": duration,
+            "engine": engine,
+            "narrated_at": time.time(),
+        }
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def narrate_all(sources=source_dir, out=out_dir, engine=default_engine, workers=None, voice=edge_voice, lang="en"):
+    """Narrate every .txt article under sources; returns (narrated, skipped, failed) counts"""
+    os.makedirs(out, exist_ok=True)
+    manifest = NarrationManifest(os.path.join(out, "manifest.json"))
+
+    jobs = []
+    skipped = 0
+    for source in sorted(glob.glob(os.path.join(sources, "*.txt"))):
+        source_hash = _file_hash(source)
+        if manifest.is_done(source, source_hash, engine):
+            skipped += 1
+            continue
+        name = os.path.splitext(os.path.basename(source))[0]
+        jobs.append((source, source_hash, os.path.join(out, f"{name}.{_EXTENSIONS[engine]}")))
+    print(f"{len(jobs)} articles to narrate, {skipped} already done")
+
+    narrated = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(narrate_file, source, output, engine, voice, lang): (source, source_hash, output)
+                   for source, source_hash, output in jobs}
+        for future in as_completed(futures):
+            source, source_hash, output = futures[future]
+            try:
+                duration = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Failed: {source}: {e}")
+                continue
+            manifest.record(source, source_hash, output, duration, engine)
+            narrated += 1
+            print(f"Narrated ({narrated}/{len(jobs)}): {output} ({duration or 0:.1f}s)")
+    return narrated, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Narrate scraped articles to audio files")
+    parser.add_argument("sources", nargs="?", default=source_dir)
+    parser.add_argument("--out", default=out_dir)
+    parser.add_argument("--engine", choices=sorted(_EXTENSIONS), default=default_engine)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--voice", default=edge_voice)
+    parser.add_argument("--lang", default="en")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    narrated, skipped, failed = narrate_all(args.sources, args.out, args.engine, args.workers, args.voice, args.lang)
+    print(f"Narrated {narrated}, skipped {skipped}, failed {failed} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
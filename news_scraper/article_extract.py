@@ -0,0 +1,155 @@
+import re
+import threading
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# lxml is used when installed; BeautifulSoup stays available as the fallback engine
+default_engine = "lxml" if etree is not None else "bs4"
+
+# Byte patterns that let us jump straight to the article region instead of parsing the whole page
+_TITLE_MARK = re.compile(rb"""<h1\b[^>]*class\s*=\s*["'][^"']*\bHNMDR\b""", re.IGNORECASE)
+_BODY_MARK = re.compile(rb"""<div\b[^>]*data-articlebody\s*=\s*["']?1\b""", re.IGNORECASE)
+_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w-]+)""", re.IGNORECASE)
+
+# Elements whose text is never article text (matches what bs4's get_text skips)
+_SKIP_TAGS = {"script", "style", "template", "noscript"}
+
+if etree is not None:
+    _TITLE_XPATH = etree.XPath('//h1[contains(concat(" ", normalize-space(@class), " "), " HNMDR ")]')
+    _BODY_XPATH = etree.XPath('//div[@data-articlebody="1"]')
+
+# lxml parsers must not be shared between threads, so each fetch worker keeps its own per encoding
+_local = threading.local()
+
+
+def _html_parser(encoding):
+    # Slices lose the <meta charset>, so the parser is told the page encoding up front
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        try:
+            parser = etree.HTMLParser(encoding=encoding, remove_comments=True)
+        except LookupError:
+            parser = etree.HTMLParser(encoding="utf-8", remove_comments=True)
+        parsers[encoding] = parser
+    return parser
+
+
+def _sniff_encoding(content):
+    match = _CHARSET.search(content, 0, 4096)
+    return match.group(1).decode("ascii").lower() if match else "utf-8"
+
+
+def _element_text(element, separator="\n", skip_tags=_SKIP_TAGS):
+    """Equivalent of bs4's get_text(separator=..., strip=True) for an lxml element"""
+    parts = []
+
+    def walk(el):
+        if el.tag in skip_tags:
+            return
+        if el.text:
+            parts.append(el.text)
+        for child in el:
+            if isinstance(child.tag, str):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(element)
+    return separator.join(text for text in (part.strip() for part in parts) if text)
+
+
+def body_complete_detector(body_mark=_BODY_MARK, body_tag="div"):
+    """stop_when factory for Fetcher.get: its check turns True once the element opened at body_mark has closed"""
+    tag_pattern = re.compile(rb"<(/?)" + re.escape(body_tag.encode("ascii")) + rb"\b", re.IGNORECASE)
+    state = {"pos": 0, "depth": None}
+
+    def complete(body):
+        if state["depth"] is None:
+            match = body_mark.search(body, state["pos"])
+            if not match:
+                # The marker may be split across chunks, so keep a little overlap
+                state["pos"] = max(0, len(body) - 1024)
+                return False
+            state["depth"] = 1
+            state["pos"] = match.end()
+
+        for tag in tag_pattern.finditer(body, state["pos"]):
+            state["pos"] = tag.end()
+            state["depth"] += -1 if tag.group(1) else 1
+            if state["depth"] == 0:
+                return True
+        # Rescan only the tail, where a tag may have been cut in half
+        state["pos"] = max(state["pos"], len(body) - 6)
+        return False
+
+    return complete
+
+
+def extract_region(content, title_xpath, body_xpath, title_mark=None, body_mark=None):
+    """(title, body) for compiled title/body XPaths; body is None when the body element is missing.
+
+    With byte markers for the body (and optionally the title) only the region
+    from the headline onwards is parsed.
+    """
+    parser = _html_parser(_sniff_encoding(content))
+
+    body_match = body_mark.search(content) if body_mark is not None else None
+    if body_match:
+        # Parse only from the headline/article body onwards; the <head>, nav and
+        # inline scripts before it never reach the parser
+        title_match = title_mark.search(content, 0, body_match.start()) if title_mark is not None else None
+        start = title_match.start() if title_match else body_match.start()
+        root = etree.fromstring(content[start:], parser)
+    else:
+        root = None
+
+    if root is None or not body_xpath(root):
+        # Markup we did not anticipate: fall back to a full-document parse
+        root = etree.fromstring(content, parser)
+        if root is None:
+            return "No title found", None
+
+    title_tags = title_xpath(root)
+    title = _element_text(title_tags[0], separator="") if title_tags else "No title found"
+
+    bodies = body_xpath(root)
+    if not bodies:
+        return title, None
+    return title, _element_text(bodies[0])
+
+
+def extract_with_lxml(content):
+    """(title, body) using lxml and precompiled XPath; body is None when there is no article div"""
+    return extract_region(content, _TITLE_XPATH, _BODY_XPATH, _TITLE_MARK, _BODY_MARK)
+
+
+def extract_with_bs4(content):
+    """(title, body) using a full BeautifulSoup tree; body is None when there is no article div"""
+    soup = BeautifulSoup(content, "html.parser")
+
+    title_tag = soup.find("h1", class_="HNMDR")
+    title = title_tag.get_text(strip=True) if title_tag else "No title found"
+
+    article_div = soup.find("div", attrs={"data-articlebody": "1"})
+    if not article_div:
+        return title, None
+    return title, article_div.get_text(separator="\n", strip=True)
+
+
+engines = {
+    "bs4": extract_with_bs4,
+}
+if etree is not None:
+    engines["lxml"] = extract_with_lxml
+
+
+def extract_article(content, engine=None):
+    return engines[engine or default_engine](content)
@@ -0,0 +1,139 @@
+# Single-file article store (SQLite in WAL mode) used instead of one .txt per article.
+#
+#   python article_store.py export [out_dir]   # write every article back out as .txt files
+#   python article_store.py compact            # drop superseded versions and reclaim space
+#
+# Rows are only ever appended; a re-scraped article gets a new row and the old
+# one is marked superseded until the next compaction.
+
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+# Default location of the article store
+store_path = os.path.join("scraped_news", "articles.db")
+
+
+class ArticleStore:
+    def __init__(self, path=None):
+        path = path or store_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " title TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " content_hash TEXT,"
+            " body BLOB,"
+            " superseded INTEGER NOT NULL DEFAULT 0"
+            ");"
+            "CREATE INDEX IF NOT EXISTS articles_url ON articles (url, superseded);"
+            "CREATE INDEX IF NOT EXISTS articles_hash ON articles (content_hash);"
+            "CREATE INDEX IF NOT EXISTS articles_time ON articles (fetched_at);"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        url, title, fetched_at, content_hash, body = row
+        return {
+            "url": url,
+            "title": title,
+            "fetched_at": fetched_at,
+            "content_hash": content_hash,
+            "content": zlib.decompress(body).decode("utf-8"),
+        }
+
+    def put(self, url, title, content, content_hash=None, fetched_at=None):
+        with self.conn:
+            self.conn.execute("UPDATE articles SET superseded = 1 WHERE url = ? AND superseded = 0", (url,))
+            self.conn.execute(
+                "INSERT INTO articles (url, title, fetched_at, content_hash, body) VALUES (?, ?, ?, ?, ?)",
+                (url, title, fetched_at or time.time(), content_hash, zlib.compress(content.encode("utf-8"))),
+            )
+
+    def get(self, url):
+        """Latest version of the article at url"""
+        return self._row(self.conn.execute(
+            "SELECT url, title, fetched_at, content_hash, body FROM articles WHERE url = ? AND superseded = 0",
+            (url,),
+        ).fetchone())
+
+    def get_by_hash(self, content_hash):
+        return self._row(self.conn.execute(
+            "SELECT url, title, fetched_at, content_hash, body FROM articles"
+            " WHERE content_hash = ? AND superseded = 0 LIMIT 1",
+            (content_hash,),
+        ).fetchone())
+
+    def iter_articles(self, since=None, batch_size=256):
+        """Stream current articles oldest first without loading the whole store"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT url, title, fetched_at, content_hash, body FROM articles"
+            " WHERE superseded = 0 AND fetched_at >= ? ORDER BY fetched_at",
+            (since or 0,),
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield self._row(row)
+
+    def compact(self):
+        """Delete superseded versions and hand the freed pages back to the filesystem"""
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM articles WHERE superseded = 1").rowcount
+        self.conn.execute("PRAGMA incremental_vacuum")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def close(self):
+        self.conn.close()
+
+
+def export_to_files(store, out_dir=None):
+    """Write every current article out with the original per-file writer"""
+    import news_scraper_v_0_2 as scraper
+
+    if out_dir:
+        scraper.output_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for article in store.iter_articles():
+        filepath = scraper.article_path(article["title"], article["url"])
+        scraper.write_article_file(filepath, article["title"], article["url"], article["content"])
+        count += 1
+    return count
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    store = ArticleStore()
+    try:
+        if command == "export":
+            count = export_to_files(store, sys.argv[2] if len(sys.argv) > 2 else None)
+            print(f"Exported {count} articles")
+        elif command == "compact":
+            print(f"Removed {store.compact()} superseded versions")
+        else:
+            print("Usage: python article_store.py export [out_dir] | compact")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
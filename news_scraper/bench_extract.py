@@ -0,0 +1,106 @@
+# Compare the lxml and BeautifulSoup extraction engines on saved article pages.
+#
+#   python bench_extract.py --save pages 20     # save 20 pages from the Times of India feed
+#   python bench_extract.py pages               # per-article parse time and peak memory per engine
+#
+# Each engine runs in its own child process so the reported peak RSS is not
+# polluted by the other engine; tracemalloc covers Python-heap allocations
+# (lxml's libxml2 allocations only show up in the RSS column).
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from article_extract import engines
+from bench_util import peak_rss_kb, percentile
+
+
+def load_pages(pages_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def save_pages(pages_dir, count):
+    from news_scraper_v_0_2 import extract_article_urls_from_rss, rss_url
+    from http_fetch import Fetcher
+
+    os.makedirs(pages_dir, exist_ok=True)
+    fetcher = Fetcher()
+    for i, (title, url) in enumerate(extract_article_urls_from_rss(rss_url, fetcher)[:count]):
+        page = fetcher.get(url)
+        with open(os.path.join(pages_dir, f"{i:03d}.html"), "wb") as f:
+            f.write(page.content)
+        print(f"Saved {url}")
+
+
+def run_engine(engine, pages, repeat):
+    extract = engines[engine]
+
+    # Timing pass, without tracemalloc overhead
+    timings = []
+    for _ in range(repeat):
+        for _, content in pages:
+            start = time.perf_counter()
+            extract(content)
+            timings.append(time.perf_counter() - start)
+
+    # Memory pass, one article at a time
+    peaks = []
+    for _, content in pages:
+        tracemalloc.start()
+        extract(content)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "engine": engine,
+        "articles": len(pages),
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "peak_heap_kb": max(peaks) / 1024 if peaks else 0.0,
+        "max_rss_kb": peak_rss_kb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the article extraction engines")
+    parser.add_argument("pages_dir")
+    parser.add_argument("count", nargs="?", type=int, default=20)
+    parser.add_argument("--save", action="store_true", help="download pages from the feed instead of benchmarking")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--engine", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.pages_dir, args.count)
+        return
+
+    if args.engine:
+        # Child process: benchmark a single engine and report as JSON
+        print(json.dumps(run_engine(args.engine, load_pages(args.pages_dir), args.repeat)))
+        return
+
+    if not load_pages(args.pages_dir):
+        sys.exit(f"No .html pages in {args.pages_dir}")
+
+    print(f"{'engine':<8}{'articles':>10}{'mean ms':>10}{'p95 ms':>10}{'heap KB':>12}{'RSS KB':>12}")
+    for engine in engines:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), args.pages_dir, "--engine", engine, "--repeat", str(args.repeat)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        r = json.loads(out)
+        print(f"{r['engine']:<8}{r['articles']:>10}{r['mean_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['peak_heap_kb']:>12.0f}{r['max_rss_kb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# Scraper throughput benchmark against the local replay server.
+#
+#   python bench_scraper.py recording/ --latency 0.1 --jitter 0.05 --output bench_results.json
+#   python bench_scraper.py recording/ --baseline bench_results.json   # compare with an earlier run
+#
+# Drives extract_article_urls_from_rss, scrape_article_content and the full
+# main() against a replayed feed, and writes articles/sec, p50/p95 latency per
+# stage and peak RSS to a JSON file. Without a recording directory a synthetic
+# one is generated.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import article_store
+import near_dup
+import resilience
+import search_index
+import seen_index
+from bench_util import peak_rss_kb, percentile
+from http_cache import HTTPCache
+from http_fetch import Fetcher
+from replay_server import ReplayServer, make_synthetic_recording
+import news_scraper_v_0_2 as scraper
+
+
+def _stage(name, latencies, wall, items):
+    return {
+        "stage": name,
+        "items": items,
+        "wall_s": wall,
+        "items_per_s": items / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+def bench_feed(feed_url, repeat):
+    fetcher = Fetcher()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        articles = scraper.extract_article_urls_from_rss(feed_url, fetcher)
+        latencies.append(time.perf_counter() - t)
+    wall = time.perf_counter() - start
+    fetcher.close()
+    return _stage("extract_article_urls_from_rss", latencies, wall, repeat), articles
+
+
+def bench_articles(urls):
+    fetcher = Fetcher()
+
+    def timed(url):
+        t = time.perf_counter()
+        scraper.scrape_article_content(url, fetcher)
+        return time.perf_counter() - t
+
+    start = time.perf_counter()
+    latencies = list(fetcher.map(timed, urls))
+    wall = time.perf_counter() - start
+    fetcher.close()
+    return _stage("scrape_article_content", latencies, wall, len(urls))
+
+
+# Module-level locations of everything main() persists, redirected into a scratch directory by bench_main
+_STATE_PATHS = [
+    (scraper, "output_dir", ""),
+    (scraper, "metrics_report_path", "last_run_metrics.json"),
+    (seen_index, "index_path", "seen_index.db"),
+    (near_dup, "index_path", "near_dup.db"),
+    (article_store, "store_path", "articles.db"),
+    (search_index, "index_dir", "search_index"),
+    (resilience, "retry_queue_path", "retry_queue.json"),
+]
+
+
+def bench_main(feed_url, article_count):
+    # Absolute paths in a scratch directory, so caches and indexes start empty and nothing
+    # still open at exit (the HTTP cache, the search index) depends on the working directory
+    work_dir = tempfile.mkdtemp(prefix="bench_scraper_")
+    output_dir = os.path.join(work_dir, "scraped_news")
+    os.makedirs(output_dir)
+    saved_url = scraper.rss_url
+    saved_paths = [getattr(module, name) for module, name, _ in _STATE_PATHS]
+    fetcher = Fetcher(cache=HTTPCache(os.path.join(work_dir, "http_cache")))
+    try:
+        scraper.rss_url = feed_url
+        for module, name, filename in _STATE_PATHS:
+            setattr(module, name, os.path.join(output_dir, filename) if filename else output_dir)
+        start = time.perf_counter()
+        scraper.main(fetcher=fetcher)
+        wall = time.perf_counter() - start
+    finally:
+        fetcher.close()
+        search_index.close_search_index()
+        scraper.rss_url = saved_url
+        for (module, name, _), value in zip(_STATE_PATHS, saved_paths):
+            setattr(module, name, value)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return _stage("main", [wall], wall, article_count)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {s["stage"]: s for s in json.load(f)["stages"]}
+    for stage in results["stages"]:
+        old = baseline.get(stage["stage"])
+        if not old or not old["items_per_s"]:
+            continue
+        change = (stage["items_per_s"] - old["items_per_s"]) / old["items_per_s"] * 100
+        print(f"{stage['stage']:<32}{old['items_per_s']:>10.1f} -> {stage['items_per_s']:>8.1f} items/s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a replayed feed")
+    parser.add_argument("recording_dir", nargs="?")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--feed-repeat", type=int, default=10)
+    parser.add_argument("--synthetic-count", type=int, default=50)
+    parser.add_argument("--label", default="", help="version label stored with the results")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    recording_dir = args.recording_dir
+    synthetic = not recording_dir
+    if synthetic:
+        recording_dir = tempfile.mkdtemp(prefix="recording_")
+        make_synthetic_recording(recording_dir, args.synthetic_count)
+
+    server = ReplayServer(recording_dir, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, seed=0)
+    try:
+        with server, contextlib.redirect_stdout(io.StringIO()):
+            feed_stage, articles = bench_feed(server.feed_url, args.feed_repeat)
+            article_stage = bench_articles([url for _, url in articles])
+            main_stage = bench_main(server.feed_url, len(articles))
+    finally:
+        if synthetic:
+            shutil.rmtree(recording_dir, ignore_errors=True)
+
+    results = {
+        "label": args.label,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "articles": len(articles),
+        "stages": [feed_stage, article_stage, main_stage],
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'stage':<32}{'items':>7}{'items/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for s in results["stages"]:
+        print(f"{s['stage']:<32}{s['items']:>7}{s['items_per_s']:>10.1f}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}")
+    print(f"peak RSS: {results['peak_rss_kb']} KB, results written to {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
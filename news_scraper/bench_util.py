@@ -0,0 +1,18 @@
+# Helpers shared by the benchmark scripts, so every report computes its numbers the same way.
+
+import resource
+import sys
+
+
+def percentile(values, q):
+    """Nearest-rank q-quantile (0 <= q <= 1) of values; 0.0 when there are none"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
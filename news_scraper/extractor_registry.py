@@ -0,0 +1,171 @@
+import functools
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from article_extract import (
+    _SKIP_TAGS, _element_text, _html_parser, _sniff_encoding,
+    body_complete_detector, etree, extract_region, extract_with_bs4,
+)
+
+# Per-site selectors, keyed by domain (subdomains fall back to their parent domain)
+config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extractors.json")
+
+# Page chrome that never holds the article text in the generic fallback
+_CHROME_TAGS = _SKIP_TAGS | {"nav", "header", "footer", "aside", "form"}
+
+if etree is not None:
+    _LEAF_BLOCKS = etree.XPath(".//p|.//div")
+
+
+class SiteExtractor:
+    """Compiled title/body XPaths for one site, plus optional byte markers for subtree parsing and early stop"""
+
+    def __init__(self, name, title, body, title_marker=None, body_marker=None, body_tag="div"):
+        self.name = name
+        self.title_xpath = etree.XPath(title)
+        self.body_xpath = etree.XPath(body)
+        self.title_mark = re.compile(title_marker.encode("utf-8"), re.IGNORECASE) if title_marker else None
+        self.body_mark = re.compile(body_marker.encode("utf-8"), re.IGNORECASE) if body_marker else None
+        self.body_tag = body_tag
+
+    def extract(self, content):
+        return extract_region(content, self.title_xpath, self.body_xpath, self.title_mark, self.body_mark)
+
+    def stop_when(self):
+        if self.body_mark is None:
+            return None
+        return functools.partial(body_complete_detector, self.body_mark, self.body_tag)
+
+
+def _link_density(element):
+    text_length = len(_element_text(element, skip_tags=_CHROME_TAGS)) or 1
+    link_length = sum(len(_element_text(a)) for a in element.iter("a"))
+    return link_length / text_length
+
+
+def extract_readable(content):
+    """Readability-style fallback: pick the container whose paragraphs carry the most text"""
+    root = etree.fromstring(content, _html_parser(_sniff_encoding(content)))
+    if root is None:
+        return "No title found", None
+
+    title = "No title found"
+    for path in ("//h1", "//meta[@property='og:title']/@content", "//title"):
+        found = root.xpath(path)
+        if found:
+            text = found[0] if isinstance(found[0], str) else _element_text(found[0], separator="")
+            if text.strip():
+                title = text.strip()
+                break
+
+    # Each substantial paragraph (a <p>, or a leaf <div> on sites that use divs
+    # for paragraphs) scores its parent fully and its grandparent half
+    scores = defaultdict(float)
+    for p in root.iter("p", "div"):
+        if p.tag == "div" and _LEAF_BLOCKS(p):
+            continue
+        text = _element_text(p)
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = p.getparent()
+        if parent is None or parent.tag in _CHROME_TAGS:
+            continue
+        scores[parent] += score
+        grandparent = parent.getparent()
+        if grandparent is not None and grandparent.tag not in _CHROME_TAGS:
+            scores[grandparent] += score / 2
+
+    if not scores:
+        return title, None
+    best = max(scores, key=lambda el: scores[el] * (1 - _link_density(el)))
+    return title, _element_text(best, skip_tags=_CHROME_TAGS) or None
+
+
+class ExtractorRegistry:
+    def __init__(self, path=config_path):
+        self.sites = {}
+        if etree is not None and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for domain, spec in json.load(f).items():
+                    self.sites[domain.lower()] = SiteExtractor(domain, **spec)
+        self._by_host = {}
+        self._lock = threading.Lock()
+        # extractor name -> {"hit": n, "miss": n}
+        self.stats = defaultdict(lambda: {"hit": 0, "miss": 0})
+
+    def for_host(self, host):
+        """The site extractor for host (or its nearest configured parent domain), cached per host"""
+        host = host.lower().split(":")[0]
+        try:
+            return self._by_host[host]
+        except KeyError:
+            pass
+        labels = host.split(".")
+        site = None
+        for i in range(len(labels) - 1):
+            site = self.sites.get(".".join(labels[i:]))
+            if site is not None:
+                break
+        with self._lock:
+            self._by_host[host] = site
+        return site
+
+    def stop_when(self, url):
+        site = self.for_host(urlsplit(url).netloc)
+        return site.stop_when() if site is not None else None
+
+    def _count(self, name, found):
+        with self._lock:
+            self.stats[name]["hit" if found else "miss"] += 1
+
+    def extract(self, url, content):
+        """(title, body) using the site's selectors, falling back to the generic extractor"""
+        if etree is None:
+            return extract_with_bs4(content)
+
+        site = self.for_host(urlsplit(url).netloc)
+        title = "No title found"
+        if site is not None:
+            title, body = site.extract(content)
+            self._count(site.name, body is not None)
+            if body is not None:
+                return title, body
+
+        fallback_title, body = extract_readable(content)
+        self._count("readability", body is not None)
+        return title if title != "No title found" else fallback_title, body
+
+    def report(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in self.stats.items()}
+
+    def take_report(self):
+        """report() and reset the counters, e.g. to hand a worker process's counts back to its parent"""
+        with self._lock:
+            report = {name: dict(counts) for name, counts in self.stats.items()}
+            self.stats.clear()
+        return report
+
+    def merge(self, report):
+        """Add counts taken from another registry"""
+        with self._lock:
+            for name, counts in report.items():
+                for outcome, count in counts.items():
+                    self.stats[name][outcome] += count
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_registry():
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ExtractorRegistry()
+        return _default_registry
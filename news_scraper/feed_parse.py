@@ -0,0 +1,71 @@
+import io
+import re
+
+from article_extract import etree
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_RSS1 = "{http://purl.org/rss/1.0/}"
+
+# Feed elements that close one item; everything else is only read inside them
+_ITEM_TAGS = ("item", _RSS1 + "item", _ATOM + "entry")
+
+# Some feeds only link the article from the HTML in <description>
+_HREF = re.compile(r'href="([^"]+)"')
+
+
+def _text(element, *tags):
+    for tag in tags:
+        found = element.find(tag)
+        if found is not None and found.text and found.text.strip():
+            return found.text.strip()
+    return None
+
+
+def _rss_item(element):
+    url = _text(element, "link", _RSS1 + "link")
+    guid = _text(element, "guid")
+    if not url and guid and element.find("guid").get("isPermaLink", "true") == "true" and guid.startswith("http"):
+        url = guid
+    if not url:
+        match = _HREF.search(_text(element, "description", _RSS1 + "description") or "")
+        url = match.group(1) if match else None
+    return {
+        "title": _text(element, "title", _RSS1 + "title") or "",
+        "url": url,
+        "guid": guid,
+        "pub_date": _text(element, "pubDate", "{http://purl.org/dc/elements/1.1/}date"),
+    }
+
+
+def _atom_entry(element):
+    url = None
+    for link in element.iter(_ATOM + "link"):
+        if link.get("rel", "alternate") == "alternate" and link.get("href"):
+            url = link.get("href").strip()
+            break
+    return {
+        "title": _text(element, _ATOM + "title") or "",
+        "url": url,
+        "guid": _text(element, _ATOM + "id"),
+        "pub_date": _text(element, _ATOM + "updated", _ATOM + "published"),
+    }
+
+
+def iter_feed_items(source):
+    """Yield RSS/Atom items as dicts with title, url, guid and pub_date while the feed is parsed.
+
+    source is a path, a file object or the raw feed bytes. Each item is cleared
+    (along with everything before it) once it has been read, so memory stays flat
+    however long the feed is.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    for _, element in etree.iterparse(source, events=("end",), tag=_ITEM_TAGS,
+                                      recover=True, resolve_entities=False, huge_tree=True):
+        item = _atom_entry(element) if element.tag == _ATOM + "entry" else _rss_item(element)
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+        if item["url"]:
+            yield item
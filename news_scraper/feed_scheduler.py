@@ -0,0 +1,174 @@
+# Poll many feeds, each at a rate learned from how often it actually publishes.
+#
+#   python feed_scheduler.py feeds.txt      # one feed URL per line, '#' for comments
+#
+# Busy feeds converge to short intervals and quiet ones back off towards
+# max_interval, while a token bucket caps total feed requests per minute.
+
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Scheduler defaults, in seconds
+min_interval = 60
+max_interval = 2 * 60 * 60
+initial_interval = 5 * 60
+max_requests_per_minute = 30
+state_path = os.path.join("scraped_news", "feed_state.json")
+
+# How quickly the interval estimate follows new observations
+smoothing = 0.3
+# Interval growth after a poll that found nothing new
+backoff = 1.5
+
+
+def _pub_timestamps(items):
+    stamps = []
+    for item in items:
+        try:
+            stamps.append(parsedate_to_datetime(item["pub_date"]).timestamp())
+        except (KeyError, TypeError, ValueError):
+            pass
+    return sorted(stamps)
+
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` requests per minute with bursts up to the same size"""
+
+    def __init__(self, per_minute=max_requests_per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.refill_rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+
+class FeedScheduler:
+    def __init__(self, feeds, poll_feed, limiter=None, state_path=state_path):
+        """poll_feed(url) must return the list of new feed items (dicts with an optional pub_date)"""
+        self.poll_feed = poll_feed
+        self.limiter = limiter or RateLimiter()
+        self.state_path = state_path
+        self.state = self._load_state()
+
+        now = time.time()
+        self.queue = []
+        for url in feeds:
+            feed = self.state.setdefault(url, {"interval": initial_interval, "last_poll": None, "next_poll": now})
+            heapq.heappush(self.queue, (min(feed["next_poll"], now + feed["interval"]), url))
+
+    def _load_state(self):
+        if self.state_path and os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def learn(self, url, new_items, polled_at):
+        """Update the feed's interval from the new-item rate and the pubDate gaps between items"""
+        feed = self.state[url]
+        interval = feed["interval"]
+
+        if not new_items:
+            interval *= backoff
+        else:
+            # Aim to poll roughly once per new item
+            estimates = []
+            if feed["last_poll"] is not None:
+                estimates.append((polled_at - feed["last_poll"]) / len(new_items))
+            stamps = _pub_timestamps(new_items)
+            if len(stamps) > 1:
+                estimates.append((stamps[-1] - stamps[0]) / (len(stamps) - 1))
+            if estimates:
+                observed = sorted(estimates)[len(estimates) // 2]
+                interval = (1 - smoothing) * interval + smoothing * observed
+
+        feed["interval"] = max(min_interval, min(max_interval, interval))
+        feed["last_poll"] = polled_at
+        feed["next_poll"] = polled_at + feed["interval"]
+        return feed["next_poll"]
+
+    def poll_next(self):
+        """Wait for the most overdue feed, poll it and reschedule it"""
+        due, url = heapq.heappop(self.queue)
+        delay = due - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+        self.limiter.acquire()
+        polled_at = time.time()
+        try:
+            new_items = self.poll_feed(url)
+        except Exception as e:
+            print(f"Polling {url} failed: {e}")
+            new_items = []
+
+        next_poll = self.learn(url, new_items, polled_at)
+        heapq.heappush(self.queue, (next_poll, url))
+        self._save_state()
+        print(f"{url}: {len(new_items)} new, next poll in {self.state[url]['interval']:.0f}s")
+
+    def run(self, max_polls=None):
+        polls = 0
+        while self.queue and (max_polls is None or polls < max_polls):
+            self.poll_next()
+            polls += 1
+
+
+def load_feeds(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def main():
+    from http_fetch import get_fetcher
+    from news_scraper_v_0_2 import report_run, scrape_feed, rss_url
+
+    feeds = load_feeds(sys.argv[1]) if len(sys.argv) > 1 else [rss_url]
+    fetcher = get_fetcher()
+
+    def poll(url):
+        try:
+            return scrape_feed(url, fetcher)
+        finally:
+            # Each poll gets its own report rather than one that only appears at shutdown
+            report_run(fetcher)
+
+    scheduler = FeedScheduler(feeds, poll)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("Stopping scheduler")
+    finally:
+        fetcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Defaults for the on-disk HTTP cache
+cache_dir = "http_cache"
+cache_max_bytes = 256 * 1024 * 1024
+
+
+def _atomic_write(path, data):
+    # Write to a temp file in the same directory and rename over the target,
+    # so a crash or a second process never sees a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class BodyWriter:
+    """Spools a body to a temp file while it downloads; commit() files it under its hash"""
+
+    def __init__(self, cache, url):
+        self.cache = cache
+        self.url = url
+        self.hash = hashlib.sha256()
+        self.size = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.bodies_dir, prefix=".tmp-")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        self.file.write(data)
+
+    def commit(self, headers):
+        """Record the finished body; returns True if it is identical to the cached one"""
+        self.file.close()
+        digest = self.hash.hexdigest()
+        body_path = self.cache._body_path(digest)
+        if os.path.exists(body_path):
+            os.unlink(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, body_path)
+        return self.cache._record(self.url, headers, digest, self.size)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+
+class HTTPCache:
+    """Conditional-GET cache: ETag/Last-Modified validators plus content-addressed bodies, evicted LRU by size"""
+
+    def __init__(self, directory=cache_dir, max_bytes=cache_max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bodies_dir = os.path.join(directory, "bodies")
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # A corrupt index only costs us one full download per URL
+                self.entries = {}
+        atexit.register(self.flush)
+
+    def _body_path(self, digest):
+        return os.path.join(self.bodies_dir, digest)
+
+    def request_headers(self, url):
+        """Validators to send with the next request for url"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if not entry:
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def touch(self, url):
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry:
+                entry["last_used"] = time.time()
+                self._dirty = True
+
+    def store(self, url, response):
+        """Record a 200 response; returns True if the body is identical to the cached one"""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(digest)
+        if not os.path.exists(body_path):
+            _atomic_write(body_path, body)
+        return self._record(url, response.headers, digest, len(body))
+
+    def open_body(self, url):
+        """BodyWriter that streams a new body for url into the cache"""
+        return BodyWriter(self, url)
+
+    def _record(self, url, headers, digest, size):
+        with self._lock:
+            previous = self.entries.get(url)
+            unchanged = previous is not None and previous["sha256"] == digest
+            self.entries[url] = {
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "sha256": digest,
+                "size": size,
+                "last_used": time.time(),
+            }
+            if previous and not unchanged:
+                self._drop_body_if_unused(previous["sha256"])
+            self._dirty = True
+            self._evict()
+        return unchanged
+
+    def body(self, url):
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry:
+            return None
+        try:
+            with open(self._body_path(entry["sha256"]), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _drop_body_if_unused(self, digest):
+        if any(e["sha256"] == digest for e in self.entries.values()):
+            return
+        try:
+            os.unlink(self._body_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Bodies are shared between URLs with identical content, so count each digest once
+        sizes = {e["sha256"]: e["size"] for e in self.entries.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            del self.entries[url]
+            if all(e["sha256"] != entry["sha256"] for e in self.entries.values()):
+                total -= entry["size"]
+                self._drop_body_if_unused(entry["sha256"])
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.entries).encode("utf-8")
+            self._dirty = False
+        _atomic_write(self.index_path, data)
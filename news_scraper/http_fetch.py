@@ -0,0 +1,259 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+import resilience
+from http_cache import HTTPCache
+from resilience import CircuitBreaker, CircuitOpenError, FetchError, RETRYABLE_STATUS, backoff_delay, parse_retry_after
+from scrape_metrics import RunMetrics
+
+# Defaults for the concurrent fetch mode
+max_workers = 16
+per_host_limit = 6
+request_timeout = 10
+
+# Downloads are streamed in chunks and abandoned once they pass max_bytes (after decompression)
+max_bytes = 4 * 1024 * 1024
+chunk_size = 64 * 1024
+# Streamed bodies (feeds) are parsed as they arrive, so they only get a much looser sanity limit
+max_stream_bytes = 1024 * 1024 * 1024
+
+
+class Fetcher:
+    """One connection-pooled session shared by every worker, with a per-host concurrency cap"""
+
+    def __init__(self, max_workers=max_workers, per_host_limit=per_host_limit, timeout=request_timeout,
+                 cache=None, metrics=None, max_attempts=resilience.max_attempts, breaker=None, max_bytes=max_bytes):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+
+        # Keep up to per_host_limit sockets alive per host so workers reuse connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=per_host_limit)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # gzip/deflate always; br and zstd whenever urllib3 has a decoder installed for them
+        self.session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+        return slot
+
+    def _read_body(self, url, response, stop_check):
+        """(body, complete); complete is False when the download was cut short by stop_check"""
+        declared = response.headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            raise FetchError(url, f"response of {declared} bytes exceeds {self.max_bytes}",
+                             status=response.status_code, retryable=False)
+
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size):
+            body += chunk
+            if len(body) > self.max_bytes:
+                raise FetchError(url, f"response exceeds {self.max_bytes} bytes",
+                                 status=response.status_code, retryable=False)
+            if stop_check is not None and stop_check(body):
+                # Everything the caller needs has arrived; drop the rest of the page
+                return bytes(body), False
+        return bytes(body), True
+
+    def _send(self, url, host, kwargs, stop_when, stream):
+        queued = time.perf_counter()
+        with self._host_slot(host):
+            start = time.perf_counter()
+            response = self.session.get(url, stream=True, **kwargs)
+            if stream:
+                # The caller reads the body (see open_body); only the time to the headers is ours to record
+                self.metrics.observe("queue", host, start - queued)
+                self.metrics.observe("connect", host, response.elapsed.total_seconds())
+                return response
+            try:
+                response._content, complete = self._read_body(url, response, stop_when() if stop_when else None)
+                # Only a fully read socket may go back to the pool; left unconsumed, close() shuts it instead
+                response._content_consumed = complete
+            finally:
+                response.close()
+            finished = time.perf_counter()
+
+        # response.elapsed runs until the headers are parsed (DNS, connect, TTFB); the rest is the body
+        to_headers = response.elapsed.total_seconds()
+        self.metrics.observe("queue", host, start - queued)
+        self.metrics.observe("connect", host, to_headers)
+        self.metrics.observe("download", host, max(0.0, finished - start - to_headers))
+        self.metrics.add_bytes(host, len(response.content))
+        return response
+
+    def get(self, url, stop_when=None, stream=False, **kwargs):
+        """GET url with retries; raises FetchError when attempts run out or the host's circuit is open.
+
+        stop_when, if given, is called once per attempt and returns a check(body_so_far)
+        callable; the download stops early as soon as that check returns True.
+        response.not_modified is True when the cache says the body has not changed.
+        With stream=True the body is left unread for open_body(); not_modified then
+        only reflects a 304, and the caller must close the response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.cache is not None:
+            kwargs["headers"] = {**self.cache.request_headers(url), **kwargs.get("headers", {})}
+
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_attempts):
+            wait = self.breaker.check(host)
+            if wait:
+                self.metrics.count(host, "circuit_open")
+                raise CircuitOpenError(url, host, wait)
+
+            try:
+                try:
+                    response = self._send(url, host, kwargs, stop_when, stream)
+                except requests.RequestException as e:
+                    error = FetchError(url, f"{type(e).__name__}: {e}")
+                else:
+                    if response.status_code < 400:
+                        self.breaker.record_success(host)
+                        break
+                    if stream:
+                        response.close()
+                    error = FetchError(
+                        url, f"HTTP {response.status_code}",
+                        status=response.status_code,
+                        retryable=response.status_code in RETRYABLE_STATUS,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                    if not error.retryable:
+                        # A 404 says nothing bad about the host's health: it answered
+                        self.breaker.record_success(host)
+                        raise error
+                self.breaker.record_failure(host, error.retry_after)
+            finally:
+                # Whatever happened (e.g. the max_bytes abort), never leave a half-open probe outstanding
+                self.breaker.release_probe(host)
+            if attempt + 1 == self.max_attempts or (error.retry_after or 0) > resilience.max_delay:
+                # Long Retry-After: hand the item back to the caller's retry queue instead of blocking a worker
+                raise error
+            self.metrics.count(host, "retry")
+            time.sleep(error.retry_after if error.retry_after is not None else backoff_delay(attempt))
+
+        response.not_modified = False
+        if stream:
+            if response.status_code == 304:
+                response.not_modified = True
+                if self.cache is not None:
+                    self.cache.touch(url)
+        elif self.cache is not None:
+            if response.status_code == 304:
+                response.not_modified = True
+                self.cache.touch(url)
+            elif response.status_code == 200:
+                # Servers without validators still get caught by the body hash
+                response.not_modified = self.cache.store(url, response)
+        return response
+
+    def open_body(self, url, response, max_bytes=max_stream_bytes):
+        """File-like reader over a streamed 200 response; what is read also fills the HTTP cache"""
+        writer = self.cache.open_body(url) if self.cache is not None else None
+        return StreamedBody(url, response, self.metrics, max_bytes, writer)
+
+    def map(self, func, items):
+        """Run func over items on the worker pool, yielding results in input order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            yield from pool.map(func, items)
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.flush()
+
+
+class StreamedBody:
+    """Decoded body of a streamed response, read incrementally (e.g. by lxml's iterparse)"""
+
+    def __init__(self, url, response, metrics, max_bytes, writer=None):
+        self.url = url
+        self.response = response
+        self.metrics = metrics
+        self.max_bytes = max_bytes
+        self.writer = writer
+        self._chunks = response.iter_content(chunk_size)
+        self._buffer = bytearray()
+        self._size = 0
+        self._done = False
+        self._start = time.perf_counter()
+
+    def _fill(self, size):
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._finish()
+                break
+            self._size += len(chunk)
+            if self.max_bytes and self._size > self.max_bytes:
+                raise FetchError(self.url, f"response exceeds {self.max_bytes} bytes",
+                                 status=self.response.status_code, retryable=False)
+            if self.writer is not None:
+                self.writer.write(chunk)
+            self._buffer += chunk
+
+    def _finish(self):
+        self._done = True
+        host = urlsplit(self.url).netloc
+        self.metrics.observe("download", host, time.perf_counter() - self._start)
+        self.metrics.add_bytes(host, self._size)
+        if self.writer is not None:
+            self.writer.commit(self.response.headers)
+            self.writer = None
+
+    def read(self, size=-1):
+        size = -1 if size is None else size
+        self._fill(size)
+        if size < 0:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def close(self):
+        # A body abandoned half way is never cached, and its socket is closed rather than pooled
+        if self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Process-wide fetcher so the feed and article requests share one session"""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher(cache=HTTPCache())
+        return _default_fetcher
@@ -0,0 +1,132 @@
+# Near-duplicate story detection with shingled MinHash and LSH banding.
+#
+# Every article gets a MinHash signature of its word 5-shingles. Signatures are
+# split into bands and each band is hashed into a bucket, so finding candidate
+# duplicates is a handful of indexed bucket lookups rather than a scan of the
+# corpus. Candidates are confirmed by estimated Jaccard similarity and join the
+# cluster of the story they match; only the first story of a cluster (its
+# representative) goes on to be saved and narrated.
+
+import array
+import hashlib
+import os
+import random
+import re
+import sqlite3
+
+# Default location of the duplicate index
+index_path = os.path.join("scraped_news", "near_dup.db")
+
+shingle_size = 5
+num_perm = 64
+bands = 16
+rows_per_band = num_perm // bands
+similarity_threshold = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+")
+
+# Fixed seed: signatures are persisted, so the permutations must be identical in every process
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+
+def _stable_hash(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=4).digest(), "little")
+
+
+def shingles(text):
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+
+def minhash(text):
+    hashes = [_stable_hash(s.encode("utf-8")) for s in shingles(text)]
+    if not hashes:
+        return [_MAX_HASH] * num_perm
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two shingle sets"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / num_perm
+
+
+def _band_keys(signature):
+    for band in range(bands):
+        chunk = signature[band * rows_per_band:(band + 1) * rows_per_band]
+        yield band, hashlib.blake2b(array.array("I", chunk).tobytes(), digest_size=8).hexdigest()
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=None):
+        path = path or index_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id TEXT PRIMARY KEY,"
+            " cluster TEXT NOT NULL,"
+            " signature BLOB NOT NULL"
+            ");"
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " band INTEGER NOT NULL,"
+            " bucket TEXT NOT NULL,"
+            " doc_id TEXT NOT NULL"
+            ");"
+            "CREATE INDEX IF NOT EXISTS buckets_key ON buckets (band, bucket);"
+            "CREATE INDEX IF NOT EXISTS buckets_doc ON buckets (doc_id);"
+        )
+        self.conn.commit()
+
+    def _candidates(self, keys, doc_id):
+        found = set()
+        for band, bucket in keys:
+            for (other,) in self.conn.execute(
+                "SELECT doc_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            ):
+                if other != doc_id:
+                    found.add(other)
+        return found
+
+    def add(self, doc_id, text):
+        """Index the story and return the representative it duplicates, or None if it is new"""
+        signature = minhash(text)
+        keys = list(_band_keys(signature))
+
+        best, best_score = None, similarity_threshold
+        for other in self._candidates(keys, doc_id):
+            cluster, blob = self.conn.execute(
+                "SELECT cluster, signature FROM docs WHERE doc_id = ?", (other,)
+            ).fetchone()
+            score = similarity(signature, array.array("I", blob))
+            if score >= best_score:
+                best, best_score = cluster, score
+
+        cluster = best if best is not None and best != doc_id else doc_id
+        with self.conn:
+            self.conn.execute("DELETE FROM buckets WHERE doc_id = ?", (doc_id,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO docs (doc_id, cluster, signature) VALUES (?, ?, ?)",
+                (doc_id, cluster, array.array("I", signature).tobytes()),
+            )
+            self.conn.executemany(
+                "INSERT INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                [(band, bucket, doc_id) for band, bucket in keys],
+            )
+        return None if cluster == doc_id else cluster
+
+    def cluster_of(self, doc_id):
+        row = self.conn.execute("SELECT cluster FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def members(self, cluster):
+        return [doc_id for (doc_id,) in self.conn.execute("SELECT doc_id FROM docs WHERE cluster = ?", (cluster,))]
+
+    def close(self):
+        self.conn.close()
@@ -1,9 +1,21 @@
-import requests
 from bs4 import BeautifulSoup
 import re
 import os
+import io
 import hashlib
 
+from article_extract import etree
+from article_store import ArticleStore
+from extractor_registry import get_registry
+from feed_parse import iter_feed_items
+from http_fetch import get_fetcher
+from near_dup import NearDuplicateIndex
+from parse_pipeline import run_pipeline
+from resilience import FetchError, RetryQueue
+from scrape_metrics import RunMetrics, host_of
+from search_index import get_search_index
+from seen_index import SeenIndex
+
 # RSS feed URL
 rss_url = "https://timesofindia.indiatimes.com/rssfeeds/-2128936835.cms"
 
@@ -11,17 +23,85 @@ rss_url = "https://timesofindia.indiatimes.com/rssfeeds/-2128936835.cms"
 output_dir = "scraped_news"
 os.makedirs(output_dir, exist_ok=True)
 
-def extract_article_urls_from_rss(rss_url):
-    response = requests.get(rss_url)
-    soup = BeautifulSoup(response.content, "xml")
-
-    article_urls = []
-    for item in soup.find_all("item"):
-        description = item.find("description").text
-        match = re.search(r'href="([^"]+)"', description)
-        if match:
-            article_urls.append((item.title.text, match.group(1)))  # Return title + URL
-    return article_urls
+# "files" writes one .txt per article into output_dir, "store" appends to scraped_news/articles.db
+storage_backend = "files"
+
+# Syndicated copies of a story already scraped from another feed are not saved again
+skip_near_duplicates = True
+
+# Keep the full-text search index up to date as articles are saved
+build_search_index = True
+
+# Parse pages on a process pool of this size instead of in the fetch threads (0 = off);
+# worth it for large backfills where parsing, not the network, is the bottleneck
+parse_workers = 0
+
+# Per-run stage timings and host counters; set prometheus_textfile to also export them
+metrics_report_path = os.path.join("scraped_news", "last_run_metrics.json")
+prometheus_textfile = None
+
+def fresh_body(url, response, fetcher, **kwargs):
+    """Body of a response the HTTP cache called not modified: from the 200 itself, the cache, or a refetch"""
+    if response.status_code == 200:
+        return response.content
+    body = fetcher.cache.body(url) if fetcher.cache is not None else None
+    if body is not None:
+        return body
+    # requests drops headers set to None, so this asks for the full page again
+    return fetcher.get(url, headers={"If-None-Match": None, "If-Modified-Since": None}, **kwargs).content
+
+def extract_feed_items(rss_url, fetcher=None, skip_unchanged=False):
+    """Feed items as dicts with title, url, guid and pub_date, yielded as the feed is parsed.
+
+    With skip_unchanged, a feed the HTTP cache reports as not modified yields
+    nothing; otherwise its items are always returned.
+    """
+    fetcher = fetcher or get_fetcher()
+    # Streamed, so iterparse yields items while the rest of the feed is still downloading
+    response = fetcher.get(rss_url, stream=True)
+    source = None
+    try:
+        if response.not_modified:
+            if skip_unchanged:
+                # Feed unchanged since the last fully processed poll, so there is nothing new to scrape
+                print(f"Feed not modified: {rss_url}")
+                return
+            response.close()
+            cached = fetcher.cache.body(rss_url) if fetcher.cache is not None else None
+            if cached is not None:
+                source = io.BytesIO(cached)
+            else:
+                # requests drops headers set to None, so this asks for the full feed again
+                response = fetcher.get(rss_url, stream=True, headers={"If-None-Match": None, "If-Modified-Since": None})
+                source = fetcher.open_body(rss_url, response)
+        else:
+            source = fetcher.open_body(rss_url, response)
+
+        if etree is not None:
+            yield from iter_feed_items(source)
+            return
+
+        soup = BeautifulSoup(source.read(), "xml")
+        for item in soup.find_all("item"):
+            description = item.find("description").text
+            match = re.search(r'href="([^"]+)"', description)
+            if match:
+                guid = item.find("guid")
+                pub_date = item.find("pubDate")
+                yield {
+                    "title": item.title.text,
+                    "url": match.group(1),
+                    "guid": guid.text.strip() if guid else None,
+                    "pub_date": pub_date.text.strip() if pub_date else None,
+                }
+    finally:
+        # Also drops the half-written cache entry if the caller stopped early
+        response.close()
+        if source is not None:
+            source.close()
+
+def extract_article_urls_from_rss(rss_url, fetcher=None):
+    return [(item["title"], item["url"]) for item in extract_feed_items(rss_url, fetcher)]  # Return title + URL
 
 def clean_filename(name):
     # Remove invalid characters for filenames and truncate long titles
@@ -114,48 +194,234 @@ def nothing():
 
     pass
 
-def scrape_article_content(url):
+def download_article(url, fetcher=None, known=True):
+    """Raw page bytes, or None if unchanged since the last fetch; raises on failure.
+
+    known says whether the caller has the previous content on record; when it
+    does not, an unchanged page still comes back as bytes (from the response,
+    the HTTP cache, or a refetch without validators).
+    """
+    fetcher = fetcher or get_fetcher()
+    stop_when = get_registry().stop_when(url)
     try:
         print("#"*170)
         print(f"Scraping article: {url}")
         print("#"*170)
-        page = requests.get(url, timeout=10)
-        soup = BeautifulSoup(page.content, "html.parser")
-
-        # Extract headline
-        title_tag = soup.find("h1", class_="HNMDR")
-        title = title_tag.get_text(strip=True) if title_tag else "No title found"
-
-        # Find main article content
-        article_div = soup.find("div", attrs={"data-articlebody": "1"})
-        if not article_div:
-            return f"{title}\n\nNo article content found."
-
-        # Just get all the raw text inside the main article div
-        content = article_div.get_text(separator="\n", strip=True)
-
-        return f"{title}\n\n{content}"
-
+        page = fetcher.get(url, stop_when=stop_when)
+        if page.not_modified:
+            fetcher.metrics.count(host_of(url), "not_modified")
+            if known:
+                return None
+            return fresh_body(url, page, fetcher, stop_when=stop_when)
+    except Exception:
+        fetcher.metrics.count(host_of(url), "failure")
+        raise
+    return page.content
+
+def format_article(title, content):
+    if content is None:
+        return f"{title}\n\nNo article content found."
+
+    return f"{title}\n\n{content}"
+
+def fetch_article(url, fetcher=None, known=True):
+    """Article text, or None if unchanged since the last fetch (and known); raises on failure"""
+    fetcher = fetcher or get_fetcher()
+    page = download_article(url, fetcher, known)
+    if page is None:
+        return None
+
+    host = host_of(url)
+    try:
+        with fetcher.metrics.stage("parse", host):
+            title, content = get_registry().extract(url, page)
+    except Exception:
+        fetcher.metrics.count(host, "failure")
+        raise
+    fetcher.metrics.count(host, "success")
+    return format_article(title, content)
+
+def scrape_article_content(url, fetcher=None):
+    try:
+        # Callers of this wrapper keep nothing between calls, so always hand back the article
+        return fetch_article(url, fetcher, known=False)
     except Exception as e:
         return f"Failed to retrieve article: {e}"
 
-
-
-
-def main():
-    articles = extract_article_urls_from_rss(rss_url)
-
-    for i, (title, url) in enumerate(articles):
-        print(f"Scraping ({i+1}/{len(articles)}): {title}")
-        content = scrape_article_content(url)
-
-        filename = clean_filename(title)
-        if not filename:
-            filename = hashlib.md5(url.encode()).hexdigest()
-        filepath = os.path.join(output_dir, f"{filename}.txt")
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(f"{title}\n{url}\n\n{content}")
+def article_path(title, url):
+    filename = clean_filename(title)
+    if not filename:
+        filename = hashlib.md5(url.encode()).hexdigest()
+    return os.path.join(output_dir, f"{filename}.txt")
+
+def write_article_file(filepath, title, url, content):
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(f"{title}\n{url}\n\n{content}")
+
+def scrape_feed(feed_url, fetcher=None, concurrent=True, incremental=True):
+    """Scrape one feed and return the items that were new or updated"""
+    fetcher = fetcher or get_fetcher()
+    # The fetcher outlives the run (e.g. across scheduler polls), so each run starts its own metrics
+    fetcher.metrics = RunMetrics()
+
+    # Only new items, or ones whose guid/pubDate changed, are fetched again
+    index = SeenIndex() if incremental else None
+    # An unchanged feed can only be skipped when every item of its last parse was processed;
+    # a run interrupted after the feed fetch leaves it marked incomplete
+    skip_unchanged = index is not None and index.feed_complete(feed_url)
+    if index is not None:
+        index.mark_feed(feed_url, complete=False)
+    items = extract_feed_items(feed_url, fetcher, skip_unchanged)
+
+    store = ArticleStore() if storage_backend == "store" else None
+    near_dups = NearDuplicateIndex() if skip_near_duplicates else None
+    search = get_search_index() if build_search_index else None
+    retry_queue = RetryQueue()
+    pending = []
+    # URLs whose content hash is on record; only for these may a 304 be taken as "unchanged"
+    known = set()
+
+    def remember(item):
+        entry = index.get(item["url"]) if index is not None else None
+        if entry and entry["content_hash"]:
+            known.add(item["url"])
+        pending.append(item)
+        return item
+
+    def queue_items():
+        # Items are handed to the fetchers as soon as the feed parser yields them
+        seen = 0
+        for item in items:
+            seen += 1
+            # Failed items wait out their backoff (or give-up period) in the retry queue
+            if retry_queue.waiting(item["url"]):
+                continue
+            if index is None or index.needs_scrape(item):
+                yield remember(item)
+        if index is not None:
+            print(f"{len(pending)} new or updated of {seen} feed items")
+
+        # This feed's items whose fetch failed on an earlier run come back once their backoff has passed
+        pending_urls = {item["url"] for item in pending}
+        for item in retry_queue.due(feed_url):
+            if item["url"] not in pending_urls:
+                yield remember(item)
+
+    def fetch(item):
+        try:
+            return item, fetch_article(item["url"], fetcher, item["url"] in known), None
+        except Exception as e:
+            return item, None, e
+
+    def load(item):
+        page = download_article(item["url"], fetcher, item["url"] in known)
+        return (item["url"], page) if page is not None else None
+
+    def parsed(item, result, error):
+        if error is not None or result is None:
+            if error is not None and not isinstance(error, FetchError):
+                fetcher.metrics.count(host_of(item["url"]), "failure")
+            return item, None, error
+        title, content, seconds, extractor_stats = result
+        get_registry().merge(extractor_stats)
+        fetcher.metrics.observe("parse", host_of(item["url"]), seconds)
+        fetcher.metrics.count(host_of(item["url"]), "success")
+        return item, format_article(title, content), None
+
+    # Pages are fetched on the worker pool but results come back in feed order
+    if parse_workers:
+        # Parsing moves to a process pool fed by the fetch threads
+        results = (parsed(*r) for r in run_pipeline(queue_items(), load, parse_workers=parse_workers,
+                                                     fetch_workers=fetcher.max_workers))
+    elif concurrent:
+        results = fetcher.map(fetch, queue_items())
+    else:
+        results = (fetch(item) for item in queue_items())
+
+    for i, (item, content, error) in enumerate(results):
+        title, url = item["title"], item["url"]
+        entry = index.get(url) if index is not None else None
+
+        # Keep writing to the file we used before, so a retitled story does not duplicate
+        if store is not None:
+            filepath = store.path
+        else:
+            filepath = entry["path"] if entry else article_path(title, url)
+
+        # Failed fetches never reach the output; they wait in the retry queue instead
+        if error is not None:
+            if isinstance(error, FetchError) and not error.retryable:
+                print(f"Skipping ({i+1}/{len(pending)}): {title}: {error}")
+                retry_queue.remove(url)
+                if index is not None:
+                    index.record(item, None, filepath)
+            else:
+                if retry_queue.add(item, error, getattr(error, "retry_after", None), feed_url):
+                    print(f"Failed ({i+1}/{len(pending)}), queued for retry: {title}: {error}")
+            continue
+        retry_queue.remove(url)
+
+        if content is None:
+            # Only returned for known URLs, so the recorded hash is still right
+            print(f"Unchanged ({i+1}/{len(pending)}): {title}")
+            index.record(item, entry["content_hash"], filepath)
+            continue
+
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if entry and entry["content_hash"] == content_hash:
+            print(f"Unchanged ({i+1}/{len(pending)}): {title}")
+            index.record(item, content_hash, filepath)
+            continue
+
+        if near_dups is not None:
+            duplicate_of = near_dups.add(url, content)
+            if duplicate_of:
+                print(f"Near-duplicate ({i+1}/{len(pending)}): {title} (same story as {duplicate_of})")
+                if index is not None:
+                    index.record(item, content_hash, filepath)
+                continue
+
+        print(f"Saving ({i+1}/{len(pending)}): {title}")
+        with fetcher.metrics.stage("write", host_of(url)):
+            if store is not None:
+                store.put(url, title, content, content_hash)
+            else:
+                write_article_file(filepath, title, url, content)
+        if search is not None:
+            search.add(url, title, content)
+        if index is not None:
+            index.record(item, content_hash, filepath)
+
+    retry_queue.save()
+    if index is not None:
+        index.mark_feed(feed_url, complete=True)
+        index.close()
+    if store is not None:
+        store.close()
+    if near_dups is not None:
+        near_dups.close()
+    if search is not None:
+        # The index stays open for the next poll; only this run's articles are written out
+        search.flush()
+    return pending
+
+def report_run(fetcher):
+    """Write out and print the metrics of the fetcher's last scrape_feed run"""
+    fetcher.metrics.write_report(metrics_report_path)
+    if prometheus_textfile:
+        fetcher.metrics.write_prometheus(prometheus_textfile)
+    for stage, stat in fetcher.metrics.report()["stages"].items():
+        print(f"{stage:<10}{stat['count']:>6} x {stat['mean_s'] * 1000:8.1f} ms  (total {stat['total_s']:.2f} s)")
+    for name, counts in get_registry().report().items():
+        print(f"extractor {name}: {counts['hit']} hit, {counts['miss']} miss")
+
+def main(concurrent=True, incremental=True, fetcher=None):
+    fetcher = fetcher or get_fetcher()
+    try:
+        scrape_feed(rss_url, fetcher, concurrent=concurrent, incremental=incremental)
+    except FetchError as e:
+        print(f"Could not fetch feed: {e}")
+    report_run(fetcher)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,107 @@
+# Two-stage fetch -> parse pipeline.
+#
+# Fetching is I/O-bound and runs on threads; HTML parsing is CPU-bound and
+# holds the GIL, so it runs on a process pool. A semaphore bounds how many raw
+# pages can sit between the two stages, so fetchers block instead of piling
+# up bodies in memory when parsing falls behind.
+#
+#   python parse_pipeline.py reextract [out_dir]   # re-run extraction over every page in the HTTP cache
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Default sizes for the two stages
+parse_workers = os.cpu_count() or 2
+fetch_workers = 16
+
+
+def parse_page(url, content):
+    """Runs in a worker process: (title, body, seconds spent parsing, extractor hit/miss counts)
+
+    The counts are the worker registry's, so the parent has to merge them into its own.
+    """
+    from extractor_registry import get_registry
+
+    registry = get_registry()
+    start = time.perf_counter()
+    title, body = registry.extract(url, content)
+    return title, body, time.perf_counter() - start, registry.take_report()
+
+
+def run_pipeline(items, load, parse=parse_page, parse_workers=parse_workers,
+                 fetch_workers=fetch_workers, max_pending=None):
+    """Yield (item, result, error) in input order.
+
+    load(item) runs on a thread and returns (url, raw bytes), or None to skip
+    parsing; parse(url, content) runs in a worker process and must be a
+    picklable top-level function.
+    """
+    max_pending = max_pending or parse_workers * 4
+    slots = threading.BoundedSemaphore(max_pending)
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+
+        def fetch_then_submit(item):
+            # Backpressure: wait for room in the parse stage before downloading more
+            slots.acquire()
+            try:
+                loaded = load(item)
+            except BaseException:
+                slots.release()
+                raise
+            if loaded is None:
+                slots.release()
+                return None
+            future = parse_pool.submit(parse, *loaded)
+            future.add_done_callback(lambda _: slots.release())
+            return future
+
+        fetches = [(item, fetch_pool.submit(fetch_then_submit, item)) for item in items]
+        for item, fetched in fetches:
+            try:
+                parsed = fetched.result()
+                yield item, parsed.result() if parsed is not None else None, None
+            except Exception as e:
+                yield item, None, e
+
+
+def reextract_cache(out_dir=None, parse_workers=parse_workers):
+    """Re-run extraction over every page body in the HTTP cache, e.g. after a selector change"""
+    from http_cache import HTTPCache
+    import news_scraper_v_0_2 as scraper
+
+    if out_dir:
+        scraper.output_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+    cache = HTTPCache()
+    urls = list(cache.entries)
+
+    def load(url):
+        body = cache.body(url)
+        return (url, body) if body else None
+
+    count = 0
+    for url, result, error in run_pipeline(urls, load, parse_workers=parse_workers, fetch_workers=4):
+        if error is not None or result is None or result[1] is None:
+            continue
+        title, body, _, _ = result
+        scraper.write_article_file(scraper.article_path(title, url), title, url, f"{title}\n\n{body}")
+        count += 1
+    return count
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "reextract":
+        start = time.perf_counter()
+        count = reextract_cache(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Re-extracted {count} articles in {time.perf_counter() - start:.1f}s")
+    else:
+        print("Usage: python parse_pipeline.py reextract [out_dir]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# Local HTTP server that replays a recorded RSS feed and its article pages.
+#
+#   python replay_server.py record recording/ 30      # capture the live feed and 30 articles
+#   python replay_server.py synthetic recording/ 50   # generate a ToI-shaped feed offline
+#   python replay_server.py serve recording/ --latency 0.2 --jitter 0.1 --error-rate 0.05
+#
+# A recording directory holds feed.xml, pages/NNN.html and manifest.json
+# (original article url -> page file). Article links in the replayed feed are
+# rewritten to point back at the replay server.
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def record(recording_dir, rss_url, count):
+    from http_fetch import Fetcher
+    from news_scraper_v_0_2 import extract_article_urls_from_rss
+
+    pages_dir = os.path.join(recording_dir, "pages")
+    os.makedirs(pages_dir, exist_ok=True)
+    fetcher = Fetcher()
+
+    feed = fetcher.get(rss_url).content
+    with open(os.path.join(recording_dir, "feed.xml"), "wb") as f:
+        f.write(feed)
+
+    manifest = {}
+    for i, (_, url) in enumerate(extract_article_urls_from_rss(rss_url, fetcher)[:count]):
+        name = f"{i:03d}.html"
+        with open(os.path.join(pages_dir, name), "wb") as f:
+            f.write(fetcher.get(url).content)
+        manifest[url] = name
+        print(f"Recorded {url}")
+
+    with open(os.path.join(recording_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def make_synthetic_recording(recording_dir, count, seed=0):
+    """Feed and pages shaped like Times of India markup, for running the benchmark offline"""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    pages_dir = os.path.join(recording_dir, "pages")
+    os.makedirs(pages_dir, exist_ok=True)
+
+    manifest, items = {}, []
+    for i in range(count):
+        url = f"https://timesofindia.indiatimes.com/synthetic/articleshow/{100000 + i}.cms"
+        title = " ".join(rng.choice(words) for _ in range(8)).capitalize()
+        paragraphs = "".join(
+            f"<div>{' '.join(rng.choice(words) for _ in range(40))}.</div><span class=\"id-r-component br\"></span>"
+            for _ in range(25)
+        )
+        chrome = "".join(f"<script>var s{j}='{'x' * 300}';</script><div class=\"nav\"><a href=\"#\">{rng.choice(words)}</a></div>" for j in range(200))
+        html = (
+            f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title>{chrome}</head><body>"
+            f"<h1 class=\"HNMDR\"><span>{title}</span></h1><div data-articlebody=\"1\">{paragraphs}</div>{chrome}</body></html>"
+        )
+        name = f"{i:03d}.html"
+        with open(os.path.join(pages_dir, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        manifest[url] = name
+        items.append(
+            f"<item><title>{title}</title><link>{url}</link><guid>{url}</guid>"
+            f"<pubDate>Sat, 17 Oct 2026 {i % 24:02d}:{i % 60:02d}:00 +0530</pubDate>"
+            f"<description><![CDATA[<a href=\"{url}\"><img src=\"x.jpg\"/></a>{title}]]></description></item>"
+        )
+
+    with open(os.path.join(recording_dir, "feed.xml"), "w", encoding="utf-8") as f:
+        f.write(f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel><title>synthetic</title>{''.join(items)}</channel></rss>")
+    with open(os.path.join(recording_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+class ReplayServer:
+    def __init__(self, recording_dir, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+        with open(os.path.join(recording_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(os.path.join(recording_dir, "feed.xml"), "rb") as f:
+            feed = f.read()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.feed_url = f"{self.base_url}/feed.xml"
+
+        # Point every recorded article link in the feed at this server
+        self.pages = {}
+        for original_url, name in manifest.items():
+            path = f"/articles/{name}"
+            with open(os.path.join(recording_dir, "pages", name), "rb") as f:
+                self.pages[path] = f.read()
+            feed = feed.replace(original_url.encode("utf-8"), (self.base_url + path).encode("utf-8"))
+        self.pages["/feed.xml"] = feed
+        self.article_urls = [self.base_url + f"/articles/{name}" for name in manifest.values()]
+        self._thread = None
+
+    def _delay_and_fail(self):
+        with self._rng_lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        return fail
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                body = server.pages.get(self.path.split("?")[0])
+                if server._delay_and_fail():
+                    status, body = 500, b"replayed error"
+                elif body is None:
+                    status, body = 404, b"not recorded"
+                else:
+                    status = 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/rss+xml" if self.path.startswith("/feed") else "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay a news feed locally")
+    parser.add_argument("command", choices=["record", "synthetic", "serve"])
+    parser.add_argument("recording_dir")
+    parser.add_argument("count", nargs="?", type=int, default=30)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        from news_scraper_v_0_2 import rss_url
+        record(args.recording_dir, rss_url, args.count)
+    elif args.command == "synthetic":
+        make_synthetic_recording(args.recording_dir, args.count)
+    else:
+        server = ReplayServer(args.recording_dir, port=args.port, latency=args.latency,
+                              jitter=args.jitter, error_rate=args.error_rate)
+        print(f"Replaying feed at {server.feed_url}")
+        server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
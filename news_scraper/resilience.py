@@ -0,0 +1,166 @@
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Retry and circuit breaker defaults
+max_attempts = 3
+base_delay = 0.5
+max_delay = 30.0
+failure_threshold = 5
+reset_timeout = 60.0
+
+# Where failed feed items wait for their next try
+retry_queue_path = os.path.join("scraped_news", "retry_queue.json")
+
+# Statuses worth retrying; anything else outside 2xx/304 fails immediately
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    def __init__(self, url, message, status=None, retryable=True, retry_after=None):
+        super().__init__(f"{message} ({url})")
+        self.url = url
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(FetchError):
+    def __init__(self, url, host, retry_in):
+        super().__init__(url, f"circuit open for {host}, retry in {retry_in:.0f}s", retry_after=retry_in)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=base_delay, cap=max_delay):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after consecutive failures, lets one probe through after reset_timeout"""
+
+    def __init__(self, failure_threshold=failure_threshold, reset_timeout=reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        # host -> {"failures": int, "open_until": float, "probing": bool}
+        self._hosts = {}
+
+    def _state(self, host):
+        return self._hosts.setdefault(host, {"failures": 0, "open_until": 0.0, "probing": False})
+
+    def check(self, host):
+        """Seconds until the host may be tried again, or 0 if the request can go ahead"""
+        with self._lock:
+            state = self._state(host)
+            if state["failures"] < self.failure_threshold and not state["open_until"]:
+                return 0.0
+            now = time.monotonic()
+            if now < state["open_until"]:
+                return state["open_until"] - now
+            # Half-open: a single probe request decides whether the host is back
+            if state["probing"]:
+                return self.reset_timeout
+            state["probing"] = True
+            return 0.0
+
+    def release_probe(self, host):
+        """End a half-open probe that neither succeeded nor failed, so the next check can probe again"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state["probing"] = False
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts[host] = {"failures": 0, "open_until": 0.0, "probing": False}
+
+    def record_failure(self, host, retry_after=None):
+        with self._lock:
+            state = self._state(host)
+            state["failures"] += 1
+            state["probing"] = False
+            if retry_after is not None:
+                state["open_until"] = time.monotonic() + retry_after
+            elif state["failures"] >= self.failure_threshold:
+                state["open_until"] = time.monotonic() + self.reset_timeout
+
+
+class RetryQueue:
+    """Persisted list of feed items whose fetch failed, retried on later runs with backoff.
+
+    Items that ran out of retries stay on record as given up for give_up_period
+    seconds, so a host that keeps failing is not retried from scratch every poll.
+    """
+
+    def __init__(self, path=None, max_retries=5, base=60.0, give_up_period=24 * 60 * 60):
+        self.path = path or retry_queue_path
+        self.max_retries = max_retries
+        self.base = base
+        self.give_up_period = give_up_period
+        self.items = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.items = json.load(f)
+            except (OSError, ValueError):
+                self.items = {}
+
+    def add(self, item, error, retry_after=None, feed=None):
+        """Queue item from feed for another try; returns False once it has been given up on"""
+        entry = self.items.get(item["url"], {"item": item, "attempts": 0})
+        entry["attempts"] += 1
+        entry["error"] = str(error)
+        entry["feed"] = feed
+        if entry["attempts"] > self.max_retries:
+            print(f"Giving up on {item['url']} after {entry['attempts'] - 1} retries: {error}")
+            entry["given_up"] = True
+            entry["next_try"] = time.time() + self.give_up_period
+            self.items[item["url"]] = entry
+            return False
+        delay = retry_after if retry_after is not None else self.base * (2 ** (entry["attempts"] - 1))
+        entry["next_try"] = time.time() + delay
+        self.items[item["url"]] = entry
+        return True
+
+    def remove(self, url):
+        self.items.pop(url, None)
+
+    def waiting(self, url):
+        """True while url is backing off or given up on, so the feed should not hand it out again"""
+        entry = self.items.get(url)
+        return entry is not None and entry["next_try"] > time.time()
+
+    def due(self, feed=None):
+        """Items (of feed, if given) whose backoff has passed; expired given-up records are dropped"""
+        now = time.time()
+        for url, entry in list(self.items.items()):
+            if entry.get("given_up") and entry["next_try"] <= now:
+                del self.items[url]
+        return [entry["item"] for entry in self.items.values()
+                if not entry.get("given_up") and entry["next_try"] <= now
+                and (feed is None or entry.get("feed") in (None, feed))]
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.items, f, indent=2)
+        os.replace(tmp_path, self.path)
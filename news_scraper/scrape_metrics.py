@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Stages timed on the scrape path, in the order they happen
+STAGES = ("queue", "connect", "download", "parse", "write")
+
+
+def host_of(url):
+    return urlsplit(url).netloc
+
+
+class RunMetrics:
+    """Per-stage timers, byte counts and per-host outcome counters; cheap enough to leave on"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        # (stage, host) -> [count, total seconds, max seconds]
+        self.timings = defaultdict(lambda: [0, 0.0, 0.0])
+        self.bytes = defaultdict(int)
+        # (host, outcome) -> count
+        self.outcomes = defaultdict(int)
+
+    def observe(self, stage, host, seconds):
+        with self._lock:
+            stat = self.timings[(stage, host)]
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+
+    @contextmanager
+    def stage(self, stage, host=""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, host, time.perf_counter() - start)
+
+    def add_bytes(self, host, count):
+        with self._lock:
+            self.bytes[host] += count
+
+    def count(self, host, outcome):
+        with self._lock:
+            self.outcomes[(host, outcome)] += 1
+
+    def report(self):
+        """Structured summary of the run so far"""
+        with self._lock:
+            stages = defaultdict(lambda: {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            hosts = defaultdict(lambda: {"bytes": 0, "success": 0, "failure": 0, "stages": {}})
+            for (stage, host), (count, total, peak) in self.timings.items():
+                merged = stages[stage]
+                merged["count"] += count
+                merged["total_s"] += total
+                merged["max_s"] = max(merged["max_s"], peak)
+                if host:
+                    hosts[host]["stages"][stage] = {"count": count, "total_s": total, "max_s": peak}
+            for host, count in self.bytes.items():
+                hosts[host]["bytes"] = count
+            for (host, outcome), count in self.outcomes.items():
+                hosts[host][outcome] = count
+
+        for stat in stages.values():
+            stat["mean_s"] = stat["total_s"] / stat["count"] if stat["count"] else 0.0
+        return {
+            "started": self.started,
+            "elapsed_s": time.time() - self.started,
+            "stages": {name: stages[name] for name in STAGES if name in stages},
+            "hosts": dict(hosts),
+        }
+
+    def write_report(self, path):
+        _write_atomic(path, json.dumps(self.report(), indent=2))
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP scraper_stage_seconds Time spent in each scrape stage",
+            "# TYPE scraper_stage_seconds summary",
+        ]
+        with self._lock:
+            timings = sorted(self.timings.items())
+            byte_counts = sorted(self.bytes.items())
+            outcomes = sorted(self.outcomes.items())
+        for (stage, host), (count, total, _) in timings:
+            labels = f'stage="{stage}",host="{host}"'
+            lines.append(f"scraper_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"scraper_stage_seconds_count{{{labels}}} {count}")
+        lines += ["# HELP scraper_bytes_total Response bytes downloaded", "# TYPE scraper_bytes_total counter"]
+        for host, count in byte_counts:
+            lines.append(f'scraper_bytes_total{{host="{host}"}} {count}')
+        lines += ["# HELP scraper_fetches_total Article fetches by outcome", "# TYPE scraper_fetches_total counter"]
+        for (host, outcome), count in outcomes:
+            lines.append(f'scraper_fetches_total{{host="{host}",outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # node_exporter's textfile collector needs the file replaced atomically
+        _write_atomic(path, self.prometheus_text())
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,392 @@
+# Incremental full-text index over the scraped corpus with BM25 ranking.
+#
+#   python search_index.py rebuild                    # index every scraped_news/*.txt file
+#   python search_index.py 'election "exit poll"'    # terms and quoted phrases
+#
+# New articles are buffered in memory and flushed as immutable segments. Each
+# segment maps term -> varint-encoded postings (doc-id gaps, term frequency and
+# position gaps). Segments are merged in size tiers on a background thread:
+# once merge_factor neighbouring segments of similar size pile up they become
+# one segment of the next tier, dropping deleted or replaced documents on the
+# way, so each document is rewritten only a logarithmic number of times.
+
+import atexit
+import glob
+import math
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import uuid
+from collections import defaultdict
+
+# Default location of the search index
+index_dir = os.path.join("scraped_news", "search_index")
+
+flush_every = 500
+merge_factor = 4
+# Segments below this size all share the lowest tier; above max_merge_bytes they are left alone
+merge_floor_bytes = 16 * 1024
+max_merge_bytes = 256 * 1024 * 1024
+
+# BM25 parameters
+k1 = 1.2
+b = 0.75
+
+_TOKEN = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _encode(numbers, out):
+    for n in numbers:
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+
+def _decode(buf):
+    n = shift = 0
+    for byte in buf:
+        n |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield n
+            n = shift = 0
+
+
+def _tier(size):
+    return int(math.log(max(size, merge_floor_bytes) / merge_floor_bytes, merge_factor))
+
+
+def encode_postings(postings):
+    """postings: [(doc_id, [positions])] sorted by doc_id"""
+    out = bytearray()
+    last_doc = 0
+    for doc_id, positions in postings:
+        numbers = [doc_id - last_doc, len(positions)]
+        last_pos = 0
+        for pos in positions:
+            numbers.append(pos - last_pos)
+            last_pos = pos
+        _encode(numbers, out)
+        last_doc = doc_id
+    return bytes(out)
+
+
+def decode_postings(data):
+    numbers = _decode(data)
+    doc_id = 0
+    for gap in numbers:
+        doc_id += gap
+        tf = next(numbers)
+        positions = []
+        pos = 0
+        for _ in range(tf):
+            pos += next(numbers)
+            positions.append(pos)
+        yield doc_id, positions
+
+
+class SearchIndex:
+    def __init__(self, directory=None, background_merge=True):
+        directory = directory or index_dir
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.background_merge = background_merge
+        self._lock = threading.RLock()
+        self._merging = None
+
+        # Document table: external url <-> internal doc id, plus lengths for BM25
+        self.conn = sqlite3.connect(os.path.join(directory, "docs.db"), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id INTEGER PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " title TEXT,"
+            " length INTEGER NOT NULL,"
+            " deleted INTEGER NOT NULL DEFAULT 0"
+            ")"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS docs_url ON docs (url, deleted)")
+        self.conn.commit()
+        # Lengths of live documents stay in memory so queries never scan the docs table
+        self.lengths = dict(self.conn.execute("SELECT doc_id, length FROM docs WHERE deleted = 0"))
+        self.total_length = sum(self.lengths.values())
+        self.next_doc_id = (self.conn.execute("SELECT MAX(doc_id) FROM docs").fetchone()[0] or 0) + 1
+
+        self.segments = [self._load_segment(name) for name in self._read_manifest()]
+        self.buffer = defaultdict(list)
+        self.buffered_docs = 0
+
+    # -- segments -------------------------------------------------------
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, "segments.txt")
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return [line.strip() for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def _write_manifest(self):
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(seg["name"] for seg in self.segments))
+        os.replace(tmp_path, self._manifest_path())
+
+    @staticmethod
+    def _segment(name, terms):
+        return {"name": name, "terms": terms, "bytes": sum(len(data) for _, data in terms.values())}
+
+    def _load_segment(self, name):
+        with open(os.path.join(self.directory, name), "rb") as f:
+            return self._segment(name, pickle.load(f))
+
+    def _write_segment(self, terms):
+        name = f"seg_{self.next_doc_id:010d}_{uuid.uuid4().hex[:8]}.idx"
+        tmp_path = os.path.join(self.directory, name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(terms, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        return self._segment(name, terms)
+
+    # -- writing --------------------------------------------------------
+
+    def add(self, url, title, text):
+        """Index an article; re-adding a url replaces the previous version"""
+        tokens = tokenize(f"{title}\n{text}")
+        positions = defaultdict(list)
+        for pos, token in enumerate(tokens):
+            positions[token].append(pos)
+
+        with self._lock:
+            for (old_id,) in self.conn.execute(
+                "SELECT doc_id FROM docs WHERE url = ? AND deleted = 0", (url,)
+            ).fetchall():
+                self.conn.execute("UPDATE docs SET deleted = 1 WHERE doc_id = ?", (old_id,))
+                self.total_length -= self.lengths.pop(old_id, 0)
+
+            doc_id = self.next_doc_id
+            self.next_doc_id += 1
+            self.conn.execute(
+                "INSERT INTO docs (doc_id, url, title, length) VALUES (?, ?, ?, ?)",
+                (doc_id, url, title, len(tokens)),
+            )
+            self.conn.commit()
+            self.lengths[doc_id] = len(tokens)
+            self.total_length += len(tokens)
+
+            for term, term_positions in positions.items():
+                self.buffer[term].append((doc_id, term_positions))
+            self.buffered_docs += 1
+            if self.buffered_docs >= flush_every:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self.buffer:
+                return
+            terms = {term: (len(postings), encode_postings(postings)) for term, postings in self.buffer.items()}
+            self.segments.append(self._write_segment(terms))
+            self._write_manifest()
+            self.buffer = defaultdict(list)
+            self.buffered_docs = 0
+            if self._pick_merge() is not None:
+                self._start_merge()
+
+    def _pick_merge(self):
+        """The oldest run of merge_factor neighbouring segments in the same size tier, or None"""
+        run = []
+        for seg in self.segments:
+            if seg["bytes"] > max_merge_bytes:
+                run = []
+                continue
+            if run and _tier(run[-1]["bytes"]) != _tier(seg["bytes"]):
+                run = []
+            run.append(seg)
+            if len(run) == merge_factor:
+                return run
+        return None
+
+    def _start_merge(self):
+        if self._merging is not None and self._merging.is_alive():
+            return
+        if not self.background_merge:
+            self._merge_tiers()
+            return
+        self._merging = threading.Thread(target=self._merge_tiers, daemon=True)
+        self._merging.start()
+
+    def _merge_tiers(self):
+        # A merge can complete a run in the next tier up, so keep going until no tier is full
+        while True:
+            with self._lock:
+                run = self._pick_merge()
+            if run is None:
+                return
+            self.merge(run)
+
+    def merge(self, segments=None):
+        """Merge neighbouring segments (default: all of them) into one, dropping deleted and replaced documents"""
+        with self._lock:
+            to_merge = list(segments if segments is not None else self.segments)
+            live = set(self.lengths)
+        if len(to_merge) < 2:
+            return
+
+        # Neighbouring segments are in doc-id order, so concatenating their postings keeps each list sorted
+        merged = defaultdict(list)
+        for seg in to_merge:
+            for term, (_, data) in seg["terms"].items():
+                merged[term].extend(p for p in decode_postings(data) if p[0] in live)
+        terms = {term: (len(postings), encode_postings(postings)) for term, postings in merged.items() if postings}
+
+        with self._lock:
+            new_segment = self._write_segment(terms)
+            # Flushes only append, so the merged run is still in place
+            names = [seg["name"] for seg in self.segments]
+            start = names.index(to_merge[0]["name"])
+            self.segments[start:start + len(to_merge)] = [new_segment]
+            self._write_manifest()
+        for seg in to_merge:
+            try:
+                os.unlink(os.path.join(self.directory, seg["name"]))
+            except OSError:
+                pass
+
+    # -- reading --------------------------------------------------------
+
+    def _postings(self, term):
+        """All postings for term across segments and the unflushed buffer, in doc-id order"""
+        for seg in self.segments:
+            entry = seg["terms"].get(term)
+            if entry:
+                yield from decode_postings(entry[1])
+        yield from self.buffer.get(term, ())
+
+    def search(self, query, limit=10):
+        """Rank documents for a query of terms and "quoted phrases"; phrases must match exactly"""
+        phrases, terms = [], []
+        for phrase, term in _QUERY.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if tokens:
+                    phrases.append(tokens)
+                    terms.extend(tokens)
+            else:
+                terms.extend(tokenize(term))
+        if not terms:
+            return []
+
+        with self._lock:
+            live = self.lengths
+            if not live:
+                return []
+            doc_count = len(live)
+            avg_length = self.total_length / doc_count
+            postings = {term: {doc_id: pos for doc_id, pos in self._postings(term) if doc_id in live} for term in set(terms)}
+
+        candidates = None
+        for phrase in phrases:
+            matching = {doc_id for doc_id in postings[phrase[0]] if self._has_phrase(postings, phrase, doc_id)}
+            candidates = matching if candidates is None else candidates & matching
+
+        scores = defaultdict(float)
+        for term, docs in postings.items():
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, positions in docs.items():
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                tf = len(positions)
+                norm = k1 * (1 - b + b * live[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        results = []
+        for doc_id, score in top:
+            url, title = self.conn.execute("SELECT url, title FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+            results.append((score, url, title))
+        return results
+
+    @staticmethod
+    def _has_phrase(postings, phrase, doc_id):
+        starts = set(postings[phrase[0]].get(doc_id, ()))
+        for offset, token in enumerate(phrase[1:], 1):
+            positions = postings[token].get(doc_id)
+            if not positions:
+                return False
+            starts &= {pos - offset for pos in positions}
+            if not starts:
+                return False
+        return bool(starts)
+
+    def close(self):
+        self.flush()
+        if self._merging is not None:
+            self._merging.join()
+        self.conn.close()
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_search_index():
+    """Process-wide index, kept open across scrape runs so merges run between polls instead of at close"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = SearchIndex()
+            atexit.register(_default_index.close)
+        return _default_index
+
+
+def close_search_index():
+    """Close the process-wide index now instead of at exit, e.g. before its directory is removed"""
+    global _default_index
+    with _default_lock:
+        if _default_index is not None:
+            atexit.unregister(_default_index.close)
+            _default_index.close()
+            _default_index = None
+
+
+def rebuild(index, pattern=os.path.join("scraped_news", "*.txt")):
+    count = 0
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().split("\n")
+        if len(lines) < 2:
+            continue
+        index.add(lines[1], lines[0], "\n".join(lines[3:]))
+        count += 1
+    return count
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python search_index.py rebuild | <query>")
+        return
+    index = SearchIndex()
+    try:
+        if sys.argv[1] == "rebuild":
+            print(f"Indexed {rebuild(index)} articles")
+        else:
+            for score, url, title in index.search(" ".join(sys.argv[1:])):
+                print(f"{score:7.3f}  {title}\n         {url}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
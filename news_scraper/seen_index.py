@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import time
+
+# Default location of the incremental-scrape index
+index_path = os.path.join("scraped_news", "seen_index.db")
+
+
+class SeenIndex:
+    """Persistent url -> (guid, pubDate, content hash, fetch time, output path) map for incremental scraping"""
+
+    def __init__(self, path=None):
+        path = path or index_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " url TEXT PRIMARY KEY,"
+            " guid TEXT,"
+            " pub_date TEXT,"
+            " content_hash TEXT,"
+            " fetched_at REAL,"
+            " path TEXT"
+            ") WITHOUT ROWID"
+        )
+        # Feeds whose last parsed items were all processed (0 while a run is in progress)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS feeds (url TEXT PRIMARY KEY, complete INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT guid, pub_date, content_hash, fetched_at, path FROM seen WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("guid", "pub_date", "content_hash", "fetched_at", "path"), row))
+
+    def needs_scrape(self, item):
+        """True for feed items that are new or whose guid/pubDate moved since the last scrape"""
+        entry = self.get(item["url"])
+        if entry is None:
+            return True
+        return entry["guid"] != item.get("guid") or entry["pub_date"] != item.get("pub_date")
+
+    def record(self, item, content_hash, path):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO seen (url, guid, pub_date, content_hash, fetched_at, path)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (item["url"], item.get("guid"), item.get("pub_date"), content_hash, time.time(), path),
+        )
+        self.conn.commit()
+
+    def feed_complete(self, feed_url):
+        row = self.conn.execute("SELECT complete FROM feeds WHERE url = ?", (feed_url,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_feed(self, feed_url, complete):
+        self.conn.execute("INSERT OR REPLACE INTO feeds (url, complete) VALUES (?, ?)", (feed_url, int(complete)))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
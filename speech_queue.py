@@ -0,0 +1,105 @@
+# One pyttsx3 worker thread fed by a queue.
+#
+# pyttsx3 engines are not thread-safe, so every engine call happens on this
+# worker. Callers queue text with say(), and can drop whatever is queued or
+# playing with cancel() (say(text, interrupt=True) barges in). The worker
+# reports what it is doing as events that the UI drains once per frame with
+# poll(), so no callback ever runs on the render thread's data directly. The
+# worker creates its own engine, which nothing else (not even the shared engine
+# registry's shutdown) ever touches.
+
+import queue
+import threading
+
+
+class SpeechWorker:
+    """Speaks queued utterances one at a time.
+
+    Events are ("start", text), ("word", word), ("end", completed), and
+    ("error", exception) when the engine could not be started.
+    """
+
+    def __init__(self, rate=None, volume=None):
+        self.rate = rate
+        self.volume = volume
+        self._requests = queue.Queue()
+        self._events = queue.Queue()
+        # Bumped by cancel(); utterances queued under an older generation are dropped
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Set when the engine failed to start; the worker has exited
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def say(self, text, interrupt=False):
+        if not self._thread.is_alive():
+            # Nothing will ever speak this; say so instead of queueing it
+            self._events.put(("error", self.error or RuntimeError("speech worker has stopped")))
+            return
+        with self._lock:
+            if interrupt:
+                self._generation += 1
+            self._requests.put((self._generation, text))
+
+    def cancel(self):
+        """Stop the current utterance (at the next word) and drop everything queued"""
+        with self._lock:
+            self._generation += 1
+
+    def close(self):
+        self.cancel()
+        self._requests.put(None)
+        self._thread.join(timeout=2)
+
+    def poll(self):
+        """Events since the last poll, oldest first"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        try:
+            from pyttsx3.engine import Engine
+
+            # A private engine rather than pyttsx3.init(), which hands out one shared instance per driver
+            engine = Engine()
+            if self.rate is not None:
+                engine.setProperty('rate', self.rate)
+            if self.volume is not None:
+                engine.setProperty('volume', self.volume)
+        except Exception as e:
+            self.error = e
+            self._events.put(("error", e))
+            return
+
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            generation, text = request
+            if generation != self._generation:
+                continue
+
+            def on_word(name, location, length):
+                # Callbacks run inside runAndWait on this thread, the one place stop() is safe to call
+                if generation != self._generation:
+                    engine.stop()
+                else:
+                    self._events.put(("word", text[location:location + length]))
+
+            token = engine.connect('started-word', on_word)
+            self._events.put(("start", text))
+            completed = False
+            try:
+                engine.say(text)
+                engine.runAndWait()
+                completed = generation == self._generation
+            except Exception as e:
+                print(f"Speech failed: {e}")
+            finally:
+                engine.disconnect(token)
+                self._events.put(("end", completed))
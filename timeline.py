@@ -0,0 +1,89 @@
+# Single-threaded animation scheduler.
+#
+# Every animated value is a tween (or a timed callback) on one Timeline, which
+# the render loop advances once per frame with the real elapsed time from a
+# monotonic clock. Nothing sleeps and nothing needs its own thread, and a slow
+# frame just moves every animation further along instead of slowing it down.
+
+import time
+
+
+def linear(t):
+    return t
+
+
+def ease_out(t):
+    return 1 - (1 - t) ** 2
+
+
+def ease_in_out(t):
+    return 3 * t ** 2 - 2 * t ** 3
+
+
+class Tween:
+    """Moves target.attr from start to end over duration seconds; without a target it is just a timer"""
+
+    def __init__(self, target, attr, start, end, duration, ease=linear, delay=0.0, on_done=None):
+        self.target = target
+        self.attr = attr
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.ease = ease
+        self.on_done = on_done
+        # Seconds since the tween started; negative while delayed
+        self.elapsed = -delay
+        self.cancelled = False
+
+    def advance(self, dt):
+        """Apply dt seconds of progress; returns True once finished"""
+        self.elapsed += dt
+        if self.elapsed < 0:
+            return False
+        t = min(1.0, self.elapsed / self.duration) if self.duration > 0 else 1.0
+        if self.target is not None:
+            setattr(self.target, self.attr, self.start + (self.end - self.start) * self.ease(t))
+        return t >= 1.0
+
+
+class Timeline:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.now = clock()
+        self.tweens = []
+
+    def tween(self, target, attr, end, duration, start=None, ease=linear, delay=0.0, on_done=None):
+        """Animate target.attr to end, replacing any tween already running on it"""
+        self.cancel(target, attr)
+        if start is None:
+            start = getattr(target, attr)
+        tween = Tween(target, attr, start, end, duration, ease, delay, on_done)
+        self.tweens.append(tween)
+        return tween
+
+    def after(self, delay, callback):
+        """Call callback() on the first update at least delay seconds from now"""
+        tween = Tween(None, None, None, None, 0.0, delay=delay, on_done=callback)
+        self.tweens.append(tween)
+        return tween
+
+    def cancel(self, target=None, attr=None):
+        """Stop the tweens on target (and attr, if given) where they are, without calling on_done"""
+        for tween in self.tweens:
+            if tween.target is target and target is not None and attr in (None, tween.attr):
+                tween.cancelled = True
+        self.tweens = [tween for tween in self.tweens if not tween.cancelled]
+
+    def update(self):
+        """Advance every tween to the current time; returns the seconds since the last update"""
+        now = self.clock()
+        dt = now - self.now
+        self.now = now
+        # Callbacks may schedule new tweens; those start counting from the next update
+        for tween in list(self.tweens):
+            if not tween.cancelled and tween.advance(dt):
+                tween.cancelled = True
+                if tween.on_done is not None:
+                    tween.on_done()
+        self.tweens = [tween for tween in self.tweens if not tween.cancelled]
+        return dt
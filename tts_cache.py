@@ -0,0 +1,205 @@
+# On-disk cache of synthesized speech, shared by every speaker and process.
+#
+# Audio is stored content-addressed under tts_cache/ by a hash of
+# (engine, voice, lang, rate, normalized text), so a headline that was spoken
+# once plays straight from disk next time. Files are written to a temp name and
+# renamed into place, and recency lives in the file mtime rather than a shared
+# index, so several processes can read and fill the cache at once. Metadata
+# such as word timings lives in a sidecar file next to its audio and is
+# written before it and evicted with it.
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+
+# Default location and size bound of the audio cache
+cache_dir = "tts_cache"
+max_bytes = 512 * 1024 * 1024
+# Eviction frees space down to this fraction of max_bytes
+evict_to = 0.9
+# Suffix of the metadata file (e.g. word timings) kept beside an audio file and evicted with it
+sidecar_ext = ".json"
+
+
+def normalize_text(text):
+    """Text as the engines hear it: NFC, with runs of whitespace collapsed"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def cache_key(engine, text, voice=None, lang=None, rate=None):
+    fields = [engine, voice, lang, rate, normalize_text(text)]
+    return hashlib.sha256(json.dumps(fields, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory=cache_dir, max_bytes=max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Bytes in the cache as far as this process knows; None until the first write walks the directory
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key, ext):
+        return os.path.join(self.directory, key[:2], f"{key}.{ext}")
+
+    def get(self, engine, text, voice=None, lang=None, rate=None, ext="mp3"):
+        """Path of the cached audio, or None on a miss"""
+        path = self.path_for(cache_key(engine, text, voice, lang, rate), ext)
+        try:
+            # mtime doubles as the LRU clock
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def cached(self, engine, text, synthesize, voice=None, lang=None, rate=None, ext="mp3", sidecar=None):
+        """Path of the audio for text, calling synthesize(path) to produce it on a miss
+
+        sidecar, if given, is bytes stored beside the new audio (see read_sidecar).
+        """
+        path = self.get(engine, text, voice, lang, rate, ext)
+        if path is not None:
+            print(f"TTS cache hit: {path}")
+            return path
+
+        path = self.path_for(cache_key(engine, text, voice, lang, rate), ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Synthesize beside the final name so the rename is atomic; a racing process just wins or loses the replace
+        fd, tmp_path = tempfile.mkstemp(suffix=f".{ext}", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            synthesize(tmp_path)
+            if not os.path.getsize(tmp_path):
+                raise RuntimeError(f"{engine} produced no audio")
+            size = os.path.getsize(tmp_path)
+            if sidecar is not None:
+                # In place before the audio, so a cached audio file never lacks the sidecar it was stored with
+                _atomic_write(path + sidecar_ext, sidecar)
+                size += len(sidecar)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._evict(size)
+        return path
+
+    def audio(self, engine, text, synthesize, voice=None, lang=None, rate=None, ext="mp3", with_sidecar=False):
+        """Audio bytes for text; on a miss synthesize() returns them and they are cached off the playback path
+
+        With with_sidecar, synthesize() returns (audio, sidecar bytes) and so does this;
+        the sidecar is None when the audio was cached without one.
+        """
+        path = self.get(engine, text, voice, lang, rate, ext)
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                # Evicted by another process since get()
+                pass
+            else:
+                return (data, self.read_sidecar(path)) if with_sidecar else data
+        result = synthesize()
+        data, sidecar = result if with_sidecar else (result, None)
+        threading.Thread(target=self.put, args=(engine, text, data, voice, lang, rate, ext, sidecar)).start()
+        return result
+
+    def put(self, engine, text, data, voice=None, lang=None, rate=None, ext="mp3", sidecar=None):
+        """Store audio bytes that were synthesized elsewhere; returns the cached path"""
+        def write(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        return self.cached(engine, text, write, voice, lang, rate, ext, sidecar)
+
+    def read_sidecar(self, path):
+        """Bytes stored beside the cached audio at path, or None"""
+        try:
+            with open(path + sidecar_ext, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _scan(self):
+        """[(mtime, size, path)] of every cached file, skipping other processes' in-flight temp files
+
+        A sidecar counts towards its audio file's size instead of being listed on its own.
+        """
+        files = {}
+        sidecars = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.startswith("tmp") and time.time() - stat.st_mtime < 3600:
+                    continue
+                if name.endswith(sidecar_ext):
+                    sidecars.append((stat.st_mtime, stat.st_size, path))
+                else:
+                    files[path] = [stat.st_mtime, stat.st_size]
+        for mtime, size, path in sidecars:
+            audio = files.get(path[:-len(sidecar_ext)])
+            if audio is not None:
+                audio[1] += size
+            else:
+                files[path] = [mtime, size]
+        return [(mtime, size, path) for path, (mtime, size) in files.items()]
+
+    def _evict(self, added):
+        with self._lock:
+            # The directory is walked once for a running total, and again only when that total crosses the limit
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            # Other processes may have added or removed files too, so recount before deleting
+            files = self._scan()
+            total = sum(size for _, size, _ in files)
+            # Evict down to a low-water mark so the next walk is many misses away
+            target = self.max_bytes * evict_to
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                try:
+                    os.unlink(path + sidecar_ext)
+                except OSError:
+                    pass
+            self._size = total
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_audio_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AudioCache()
+        return _default_cache
@@ -0,0 +1,101 @@
+# Process-wide registry of warm TTS backends.
+#
+# pyttsx3 drivers, the pygame mixer and Coqui models are expensive to start, so
+# each one is created on first use (or preloaded in the background at startup)
+# and then shared by every speaker for the rest of the process.
+
+import atexit
+import threading
+
+# pygame mixer settings shared by every speaker. Edge TTS, gTTS and XTTS all produce
+# 24 kHz audio, so playing at that rate avoids resampling; a small buffer keeps latency low
+mixer_settings = {"frequency": 24000, "size": -16, "channels": 2, "buffer": 512}
+coqui_model = "tts_models/multilingual/multi-dataset/xtts_v2"
+
+
+def _start_pyttsx3():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+def _stop_pyttsx3(engine):
+    engine.stop()
+
+
+def _start_mixer():
+    import pygame
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(**mixer_settings)
+    return pygame.mixer
+
+
+def _stop_mixer(mixer):
+    mixer.quit()
+
+
+def _start_coqui():
+    from TTS.api import TTS
+    tts = TTS(coqui_model)
+    print("Coqui TTS initialized successfully!")
+    return tts
+
+
+class EngineRegistry:
+    """Creates each backend once, on first use, and keeps it until shutdown()"""
+
+    def __init__(self):
+        # name -> (start, stop)
+        self.factories = {
+            "pyttsx3": (_start_pyttsx3, _stop_pyttsx3),
+            "mixer": (_start_mixer, _stop_mixer),
+            "coqui": (_start_coqui, None),
+        }
+        self._engines = {}
+        self._locks = {name: threading.Lock() for name in self.factories}
+
+    def get(self, name):
+        """The warm backend for name; blocks while another thread is still loading it"""
+        engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        with self._locks[name]:
+            if name not in self._engines:
+                start, _ = self.factories[name]
+                self._engines[name] = start()
+            return self._engines[name]
+
+    def preload(self, names):
+        """Start loading backends on a background thread; failures are reported and retried on first use"""
+        def load():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Could not preload {name}: {e}")
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        for name, engine in list(self._engines.items()):
+            _, stop = self.factories[name]
+            try:
+                if stop is not None:
+                    stop(engine)
+            except Exception as e:
+                print(f"Error shutting down {name}: {e}")
+            del self._engines[name]
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_engines():
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = EngineRegistry()
+            atexit.register(_default_registry.shutdown)
+        return _default_registry
@@ -0,0 +1,202 @@
+# Sentence-chunked speech synthesis with early playback.
+#
+# Text is split into sentences, a small thread pool synthesizes them ahead of
+# playback, and StreamingPlayer starts the first one as soon as it is ready and
+# queues the rest on the same mixer channel so they play back to back.
+
+import asyncio
+import io
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from lip_sync import AmplitudeEnvelope, sound_samples
+from tts_cache import get_audio_cache
+from visemes import VisemeTimeline
+
+# Sentences synthesized ahead of the one playing
+synthesis_workers = 3
+# Longer sentences are split again at commas/semicolons so the first chunk stays short
+max_chunk_chars = 250
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_sentences(text, max_chars=max_chunk_chars):
+    chunks = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if len(sentence) <= max_chars:
+            if sentence:
+                chunks.append(sentence)
+            continue
+        current = ""
+        for clause in _CLAUSE_END.split(sentence):
+            if current and len(current) + len(clause) + 1 > max_chars:
+                chunks.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}" if current else clause
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+async def _edge_stream(text, voice):
+    import edge_tts
+
+    try:
+        communicate = edge_tts.Communicate(text, voice, boundary="WordBoundary")
+    except TypeError:
+        # Older edge-tts always reports word boundaries and has no boundary option
+        communicate = edge_tts.Communicate(text, voice)
+    audio = bytearray()
+    words = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio += chunk["data"]
+        elif chunk["type"] == "WordBoundary":
+            # Offsets and durations come in 100 ns ticks
+            words.append((chunk["offset"] / 10000, chunk["duration"] / 10000, chunk["text"]))
+    return bytes(audio), words
+
+
+def edge_audio(text, voice):
+    """MP3 bytes from edge-tts, collected from its stream in memory"""
+    return asyncio.run(_edge_stream(text, voice))[0]
+
+
+def edge_speech(text, voice):
+    """(MP3 bytes, [(start ms, duration ms, word)]) from edge-tts; the timings are cached beside the audio"""
+    def synthesize():
+        audio, words = asyncio.run(_edge_stream(text, voice))
+        return audio, json.dumps(words).encode("utf-8")
+
+    audio, words = get_audio_cache().audio("edge", text, synthesize, voice=voice, with_sidecar=True)
+    # Audio cached without its timings: callers estimate them from the audio rather than synthesizing again
+    return audio, json.loads(words) if words is not None else []
+
+
+def gtts_audio(text, lang="en"):
+    """MP3 bytes from gTTS, written to a memory buffer"""
+    import gtts
+
+    buffer = io.BytesIO()
+    gtts.gTTS(text=text, lang=lang, slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def edge_sentence(sentence, voice):
+    """A StreamingPlayer chunk: the audio plus its word timings (or the text to estimate them from)"""
+    audio, words = edge_speech(sentence, voice)
+    return audio, words or sentence
+
+
+def gtts_sentence(sentence, lang="en"):
+    return get_audio_cache().audio("gtts", sentence, lambda: gtts_audio(sentence, lang), lang=lang), sentence
+
+
+def synthesize_chunks(text, synthesize, workers=synthesis_workers):
+    """Yield synthesize(sentence) for each sentence in order, computing up to `workers` ahead"""
+    sentences = split_sentences(text)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = [pool.submit(synthesize, s) for s in sentences[:workers]]
+        for i in range(len(sentences)):
+            if i + workers < len(sentences):
+                pending.append(pool.submit(synthesize, sentences[i + workers]))
+            yield pending[i].result()
+            pending[i] = None
+    finally:
+        # Closed early (the player was stopped): drop the sentences not started, don't wait for the rest
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class StreamingPlayer:
+    """Plays audio chunks back to back on one mixer channel, starting with the first one to arrive.
+
+    Chunks are audio bytes, or (audio, word timings) / (audio, text) pairs that also
+    extend the viseme timeline. envelope and visemes grow as chunks arrive and
+    position_ms() is the playback clock to look them up with.
+    """
+
+    def __init__(self, chunks):
+        self.channel = pygame.mixer.find_channel(True)
+        self.error = None
+        self.started = threading.Event()
+        self.envelope = AmplitudeEnvelope()
+        self.visemes = VisemeTimeline()
+        # (position in ms of the chunk that started the clock, monotonic time it started)
+        self._clock = None
+        self._finished = False
+        self._stopped = False
+        # Held while deciding to play/queue, so stop() can never slip in between the check and the call
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._feed, args=(chunks,), daemon=True)
+        self._thread.start()
+
+    def _feed(self, chunks):
+        try:
+            for chunk in chunks:
+                if self._stopped:
+                    break
+                chunk, timing = chunk if isinstance(chunk, tuple) else (chunk, None)
+                sound = pygame.mixer.Sound(file=io.BytesIO(chunk))
+                # Sample-accurate start of this chunk; window-rounded offsets would drift a little per sentence
+                offset_ms = self.envelope.audio_ms
+                first_window = len(self.envelope.levels)
+                self.envelope.extend(*sound_samples(sound))
+                if isinstance(timing, str):
+                    # The estimate is laid over envelope windows, which start at their own grid position
+                    self.visemes.add_estimate(timing, self.envelope.levels[first_window:], self.envelope.window_ms,
+                                              self.envelope.reference, first_window * self.envelope.window_ms)
+                elif timing:
+                    self.visemes.add_word_boundaries(timing, offset_ms)
+                # The channel holds one queued sound; wait for the slot rather than cutting the current one off
+                while self.channel.get_busy() and self.channel.get_queue() is not None and not self._stopped:
+                    time.sleep(0.01)
+                with self._lock:
+                    if self._stopped:
+                        break
+                    if self.channel.get_busy():
+                        self.channel.queue(sound)
+                    else:
+                        # First chunk, or synthesis fell behind and playback stalled: restart the clock here
+                        self.channel.play(sound)
+                        self._clock = (offset_ms, time.monotonic())
+                self.started.set()
+            else:
+                self.envelope.finish()
+        except Exception as e:
+            self.error = e
+            print(f"Streaming synthesis failed: {e}")
+        finally:
+            # Stops the synthesis pool behind a synthesize_chunks generator
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            self._finished = True
+            self.started.set()
+
+    def position_ms(self):
+        """Milliseconds into the utterance being played, or -1 when nothing is playing"""
+        if self._clock is None or not self.channel.get_busy():
+            return -1
+        offset_ms, started = self._clock
+        return offset_ms + (time.monotonic() - started) * 1000
+
+    def get_busy(self):
+        return not self._finished or self.channel.get_busy()
+
+    def wait(self):
+        while self.get_busy():
+            time.sleep(0.05)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self.channel.stop()
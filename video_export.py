@@ -0,0 +1,116 @@
+# Headless, faster-than-realtime video export of the matplotlib avatars.
+#
+#   python video_export.py "Text to say" --speaker edge --out clip.mp4
+#
+# The speaker's scene is drawn on an Agg canvas (no display needed), posed for
+# each frame time from the lip-sync timeline, and piped as raw RGBA frames into
+# ffmpeg, which encodes them and muxes in the synthesized audio. Static parts of
+# the face are rendered once; each frame only redraws the artists that moved.
+
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Output defaults
+fps = 25
+dpi = 100
+ffmpeg = shutil.which("ffmpeg") or "ffmpeg"
+
+
+def envelope_lipsync(envelope, visemes):
+    """lipsync(t_ms) for a pre-rendered utterance: (viseme, level) while it plays, None before/after"""
+    def lipsync(t_ms):
+        if 0 <= t_ms < envelope.duration_ms:
+            return visemes.viseme_at(t_ms), envelope.at(t_ms)
+        return None
+    return lipsync
+
+
+def _audio_file(audio):
+    if isinstance(audio, str):
+        return audio, False
+    suffix = ".wav" if audio[:4] == b"RIFF" else ".mp3"
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        f.write(audio)
+    return path, True
+
+
+def render_video(figsize, build_scene, lipsync, audio, duration_ms, output, fps=fps, dpi=dpi):
+    """Render build_scene(ax, lipsync) -> update(t_ms) over duration_ms to an MP4 with audio; returns the frame count"""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    update = build_scene(ax, lipsync)
+    fig.tight_layout()
+
+    # Draw everything that never moves once, then keep it as the per-frame background
+    for artist in update(0):
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    width, height = canvas.get_width_height()
+
+    audio_path, is_temp = _audio_file(audio)
+    command = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        "-i", audio_path,
+        # x264 needs even dimensions
+        "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", output,
+    ]
+    frames = int(math.ceil(duration_ms / 1000 * fps))
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    try:
+        for frame in range(frames):
+            canvas.restore_region(background)
+            for artist in update(frame * 1000 / fps):
+                ax.draw_artist(artist)
+            process.stdin.write(canvas.buffer_rgba())
+        process.stdin.close()
+        if process.wait():
+            raise RuntimeError(f"ffmpeg exited with status {process.returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        if is_temp:
+            os.unlink(audio_path)
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a talking avatar clip without a display")
+    parser.add_argument("text")
+    parser.add_argument("--speaker", choices=["simple", "gtts", "edge"], default="edge")
+    parser.add_argument("--out", default="clip.mp4")
+    parser.add_argument("--fps", type=int, default=fps)
+    parser.add_argument("--voice", default="en-US-AriaNeural")
+    parser.add_argument("--lang", default="en")
+    args = parser.parse_args()
+
+    # The mixer is only used to decode MP3s here, so it must not need a sound card either
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from cloude_v1_4 import EdgeTTSAnimatedSpeaker, FixedGTTSAnimatedSpeaker, SimpleAnimatedSpeaker
+
+    start = time.perf_counter()
+    if args.speaker == "simple":
+        frames = SimpleAnimatedSpeaker().export_video(args.text, args.out, args.fps)
+    elif args.speaker == "gtts":
+        frames = FixedGTTSAnimatedSpeaker().export_video(args.text, args.out, args.lang, args.fps)
+    else:
+        frames = EdgeTTSAnimatedSpeaker().export_video(args.text, args.out, args.voice, args.fps)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.out}: {frames} frames ({frames / args.fps:.1f}s of video) in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
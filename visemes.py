@@ -0,0 +1,128 @@
+# Viseme timelines for lip sync.
+#
+# A timeline is a sorted list of (start ms, mouth shape) built before playback
+# from the TTS backend's word timings (edge-tts WordBoundary events, pyttsx3
+# started-word callbacks) or, when there are none, from a grapheme-to-viseme
+# estimate spread over the voiced parts of the amplitude envelope. The render
+# loop only does a binary search per frame.
+
+import bisect
+import re
+
+import numpy as np
+
+# Mouth shapes as (width, opening), both 0..1
+VISEMES = {
+    "rest": (0.5, 0.0),
+    "MBP": (0.45, 0.0),
+    "FV": (0.55, 0.15),
+    "TH": (0.55, 0.25),
+    "L": (0.6, 0.35),
+    "etc": (0.6, 0.25),
+    "SH": (0.4, 0.3),
+    "AI": (0.8, 0.9),
+    "E": (0.85, 0.5),
+    "O": (0.45, 0.8),
+    "U": (0.3, 0.45),
+}
+
+_DIGRAPHS = {
+    "th": "TH", "sh": "SH", "ch": "SH", "ph": "FV", "wh": "U", "qu": "U",
+    "oo": "U", "ee": "E", "ea": "E", "ou": "O", "ow": "O", "ck": "etc", "ng": "etc",
+}
+_LETTERS = {
+    **dict.fromkeys("ai", "AI"), **dict.fromkeys("ey", "E"), "o": "O", **dict.fromkeys("uwq", "U"),
+    **dict.fromkeys("mbp", "MBP"), **dict.fromkeys("fv", "FV"), "l": "L", "j": "SH",
+    **dict.fromkeys("cdghknrstxz", "etc"),
+}
+_WORD = re.compile(r"[A-Za-z']+|\d+")
+
+# Envelope windows quieter than this fraction of the reference level count as silence
+voiced_threshold = 0.1
+# Nominal speaking rate used to stretch a word over time when only its start is known
+ms_per_letter = 70
+
+
+def word_visemes(word):
+    """Rough viseme sequence for a written word, with repeats merged"""
+    word = word.lower()
+    shapes = []
+    i = 0
+    while i < len(word):
+        shape = _DIGRAPHS.get(word[i:i + 2])
+        if shape:
+            i += 2
+        else:
+            shape = _LETTERS.get(word[i], "etc" if word[i].isdigit() else None)
+            i += 1
+        if shape and (not shapes or shapes[-1] != shape):
+            shapes.append(shape)
+    return shapes or ["etc"]
+
+
+class VisemeTimeline:
+    def __init__(self):
+        # (start ms, insertion order, viseme); one list so a reader never sees half an insert
+        self.entries = []
+
+    def _insert(self, start_ms, shape):
+        bisect.insort(self.entries, (start_ms, len(self.entries), shape))
+
+    def add_word(self, start_ms, duration_ms, word):
+        """Spread the word's visemes evenly over its duration and close the mouth at the end"""
+        shapes = word_visemes(word)
+        step = duration_ms / len(shapes)
+        for i, shape in enumerate(shapes):
+            self._insert(start_ms + i * step, shape)
+        self._insert(start_ms + duration_ms, "rest")
+
+    def add_word_boundaries(self, words, offset_ms=0):
+        """words: [(start ms, duration ms, text)] as reported by the TTS backend"""
+        for start_ms, duration_ms, text in words:
+            self.add_word(offset_ms + start_ms, duration_ms, text)
+
+    def add_estimate(self, text, levels, window_ms, reference, offset_ms=0):
+        """Align the text's words to the voiced windows of an amplitude envelope, proportionally to their length"""
+        words = _WORD.findall(text)
+        if not words or not len(levels):
+            return
+        weights = np.array([len(word_visemes(w)) for w in words], dtype=np.float64)
+
+        voiced = np.asarray(levels) > voiced_threshold * reference
+        if not voiced.any():
+            voiced[:] = True
+        # Voiced time elapsed by the end of each window; pauses don't advance it
+        voiced_ms = np.cumsum(voiced) * window_ms
+        bounds = np.concatenate([[0.0], np.cumsum(weights)]) / weights.sum() * voiced_ms[-1]
+        edges = np.searchsorted(voiced_ms, bounds, side="right") * window_ms
+        edges[-1] = (np.flatnonzero(voiced)[-1] + 1) * window_ms
+        for word, start, end in zip(words, edges[:-1], edges[1:]):
+            self.add_word(offset_ms + float(start), max(float(end - start), window_ms), word)
+
+    @classmethod
+    def from_words(cls, words):
+        timeline = cls()
+        timeline.add_word_boundaries(words)
+        return timeline
+
+    @classmethod
+    def estimate(cls, text, envelope):
+        timeline = cls()
+        timeline.add_estimate(text, envelope.levels, envelope.window_ms, envelope.reference)
+        return timeline
+
+    def viseme_at(self, position_ms):
+        i = bisect.bisect_right(self.entries, (position_ms, float("inf"))) - 1
+        return self.entries[i][2] if i >= 0 else "rest"
+
+
+def mouth_outline(viseme, level, width, height, y, points=25):
+    """Closed lip outline (x, y arrays) for a viseme, opened in proportion to the audio level (1.0 without one)"""
+    shape_width, opening = VISEMES[viseme]
+    half = width * (0.5 + 0.5 * shape_width)
+    opening = height * opening * level
+    x = np.linspace(-half, half, points)
+    curve = np.sqrt(np.clip(1 - (x / half) ** 2, 0, 1))
+    upper = y + 0.3 * opening * curve
+    lower = y - opening * curve
+    return np.concatenate([x, x[::-1]]), np.concatenate([upper, lower[::-1]])